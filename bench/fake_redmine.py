@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import re
+import sys
+import gzip
+import json
+import time
+import hashlib
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Words to make the synthetic Japanese text
+NOUNS = ["サーバー", "ログ", "障害", "設定", "画面", "データベース", "ネットワーク", "ユーザー", "権限", "バックアップ",
+         "メモリ", "証明書", "監視", "アラート", "手順書", "リリース", "テスト", "レビュー", "仕様", "性能"]
+VERBS = ["確認し", "修正し", "調査し", "再起動し", "更新し", "追加し", "削除し", "対応し"]
+TEMPLATES = ["%sの%sを%sました。", "%sで%sが発生したため%sました。", "%sと%sについて%sてください。"]
+
+# Time of the first issue
+BASE_TIME = datetime(2024, 1, 1)
+# Status ids of the open issues
+OPEN_STATUSES = (1, 2, 3)
+
+def format_time(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class FakeRedmine:
+    """
+    Local stand-in for the Redmine REST API with synthetic projects and issues.
+
+    Parameters
+    ----------
+    projects : int
+        Number of projects
+    issues : int
+        Number of issues of each project
+    journals : int
+        Number of journals of each issue
+    sentences : int
+        Number of sentences of each description and note
+    latency : float
+        Delay of each response in seconds
+    error_rate : float
+        Ratio of the requests answered by 503 error
+    seed : int
+        Seed of the synthetic text
+    """
+    def __init__(self, projects=3, issues=100, journals=2, sentences=3, latency=0.0, error_rate=0.0, seed=0):
+        self.projects = projects
+        self.issues = issues
+        self.journals = journals
+        self.sentences = sentences
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        # Issues edited after the start (id -> (updated_on, note))
+        self.edits = {}
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.__lock = threading.Lock()
+        self.__random = random.Random(seed)
+        self.__server = None
+        self.__thread = None
+
+    # Synthetic data
+
+    def text(self, key):
+        """
+        Make the synthetic text. The same key gives the same text.
+        """
+        rnd = random.Random("%d:%s" % (self.seed, key))
+        sentences = []
+        for _ in range(self.sentences):
+            template = rnd.choice(TEMPLATES)
+            words = [rnd.choice(NOUNS), rnd.choice(NOUNS), rnd.choice(VERBS)]
+            sentences.append(template % tuple(words))
+        return "".join(sentences)
+
+    def project(self, project_id):
+        return {
+            "id": project_id,
+            "name": "Project %d" % project_id,
+            "identifier": "project-%d" % project_id,
+            "description": self.text("project:%d" % project_id),
+            "status": 1,
+            "created_on": format_time(BASE_TIME),
+            "updated_on": format_time(BASE_TIME),
+        }
+
+    def issue_ids(self, project_id):
+        start = (project_id - 1) * self.issues + 1
+        return range(start, start + self.issues)
+
+    def issue_times(self, issue_id):
+        created_on = BASE_TIME + timedelta(hours=issue_id)
+        if issue_id in self.edits:
+            return created_on, self.edits[issue_id][0]
+        return created_on, created_on + timedelta(hours=self.journals)
+
+    def edit(self, issue_id, note):
+        """
+        Add the note to the issue now.
+
+        Parameters
+        ----------
+        issue_id : int
+            Id of the issue
+        note : String
+            Text of the note
+        """
+        updated_on = datetime.utcnow().replace(microsecond=0)
+        with self.__lock:
+            self.edits[issue_id] = (updated_on, note)
+
+    def issue(self, issue_id, include=()):
+        project_id = (issue_id - 1) // self.issues + 1
+        created_on, updated_on = self.issue_times(issue_id)
+        issue = {
+            "id": issue_id,
+            "project": {"id": project_id, "name": "Project %d" % project_id},
+            "tracker": {"id": issue_id % 3 + 1, "name": "Tracker %d" % (issue_id % 3 + 1)},
+            "status": {"id": issue_id % 5 + 1, "name": "Status %d" % (issue_id % 5 + 1)},
+            "subject": self.text("subject:%d" % issue_id)[:20],
+            "description": self.text("description:%d" % issue_id),
+            "created_on": format_time(created_on),
+            "updated_on": format_time(updated_on),
+        }
+        if "journals" in include:
+            issue["journals"] = [{
+                "id": issue_id * 1000 + n,
+                "user": {"id": 1, "name": "Redmine Admin"},
+                "notes": self.text("journal:%d:%d" % (issue_id, n)),
+                "created_on": format_time(created_on + timedelta(hours=n + 1)),
+                "details": [],
+            } for n in range(self.journals)]
+            if issue_id in self.edits:
+                edited_on, note = self.edits[issue_id]
+                issue["journals"].append({
+                    "id": issue_id * 1000 + self.journals,
+                    "user": {"id": 1, "name": "Redmine Admin"},
+                    "notes": note,
+                    "created_on": format_time(edited_on),
+                    "details": [],
+                })
+        if "changesets" in include:
+            issue["changesets"] = [{
+                "revision": "%040x" % issue_id,
+                "user": {"id": 1, "name": "Redmine Admin"},
+                "comments": self.text("changeset:%d" % issue_id),
+                "committed_on": format_time(updated_on),
+            }]
+        return issue
+
+    # REST API
+
+    def list_projects(self, query):
+        projects = [self.project(i) for i in range(1, self.projects + 1)]
+        return self.page("projects", projects, query)
+
+    def list_issues(self, query):
+        project_id = query.get("project_id")
+        project_ids = range(1, self.projects + 1)
+        if project_id is not None:
+            project_ids = [self.find_project_id(project_id)]
+        ids = [i for p in project_ids if p for i in self.issue_ids(p)]
+        # Filters
+        updated_on = query.get("updated_on", "")
+        if updated_on.startswith(">="):
+            ids = [i for i in ids if format_time(self.issue_times(i)[1]) >= updated_on[2:]]
+        issue_id = query.get("issue_id", "")
+        if issue_id.startswith(">="):
+            ids = [i for i in ids if i >= int(issue_id[2:])]
+        issues = [self.issue(i) for i in ids]
+        issues = [issue for issue in issues if self.match(issue, query)]
+        return self.page("issues", issues, query)
+
+    def match(self, issue, query):
+        """
+        Check the filters of the issue list. (status_id, tracker_id, created_on and subject)
+        """
+        status = query.get("status_id", "open")
+        status_id = issue["status"]["id"]
+        if status == "open" and status_id not in OPEN_STATUSES:
+            return False
+        if status == "closed" and status_id in OPEN_STATUSES:
+            return False
+        if status not in ("open", "closed", "*") and str(status_id) not in status.split("|"):
+            return False
+        tracker = query.get("tracker_id")
+        if tracker and str(issue["tracker"]["id"]) not in tracker.split("|"):
+            return False
+        created_on = query.get("created_on", "")
+        date = issue["created_on"][:10]
+        if created_on.startswith("><"):
+            start, end = created_on[2:].split("|")
+            if not start <= date <= end:
+                return False
+        elif created_on.startswith(">=") and date < created_on[2:]:
+            return False
+        elif created_on.startswith("<=") and date > created_on[2:]:
+            return False
+        subject = query.get("subject", "")
+        if subject.startswith("~") and subject[1:] not in issue["subject"]:
+            return False
+        return True
+
+    def find_project_id(self, value):
+        value = str(value)
+        if value.isdigit():
+            return int(value) if 0 < int(value) <= self.projects else None
+        match = re.fullmatch(r"project-(\d+)", value)
+        if match and 0 < int(match.group(1)) <= self.projects:
+            return int(match.group(1))
+        return None
+
+    def page(self, name, items, query):
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", 25)), 100)
+        return {name: items[offset:offset + limit], "total_count": len(items), "offset": offset, "limit": limit}
+
+    def route(self, path, query):
+        """
+        Answer the request.
+
+        Returns
+        ----------
+        (status, body) : tuple of int and dict
+        """
+        if path == "/projects.json":
+            return 200, self.list_projects(query)
+        if path == "/issues.json":
+            return 200, self.list_issues(query)
+        match = re.fullmatch(r"/projects/([\w-]+)\.json", path)
+        if match:
+            project_id = self.find_project_id(match.group(1))
+            if project_id is None:
+                return 404, {}
+            return 200, {"project": self.project(project_id)}
+        match = re.fullmatch(r"/issues/(\d+)\.json", path)
+        if match:
+            issue_id = int(match.group(1))
+            if not 0 < issue_id <= self.projects * self.issues:
+                return 404, {}
+            include = query.get("include", "").split(",")
+            return 200, {"issue": self.issue(issue_id, include)}
+        return 404, {}
+
+    def handle(self, path, query, headers=None):
+        """
+        Answer the request with the latency and the error rate.
+        The response has ETag, and is not modified if If-None-Match has it. (like Rails)
+        The body is compressed if gzip is accepted.
+
+        Returns
+        ----------
+        (status, headers, body) : tuple of int, dict and bytes
+        """
+        headers = headers or {}
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self.__lock:
+            self.requests += 1
+            error = self.__random.random() < self.error_rate
+            if error:
+                self.errors += 1
+        if error:
+            return 503, {}, b""
+        status, body = self.route(path, query)
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        response_headers = {"Content-Type": "application/json; charset=utf-8"}
+        if status == 200:
+            etag = 'W/"%s"' % hashlib.md5(data).hexdigest()
+            response_headers["ETag"] = etag
+            if etag in headers.get("If-None-Match", ""):
+                status, data = 304, b""
+                with self.__lock:
+                    self.not_modified += 1
+        if data and "gzip" in headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            response_headers["Content-Encoding"] = "gzip"
+        with self.__lock:
+            self.bytes_sent += len(data)
+        return status, response_headers, data
+
+    # Server
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[:2]
+        return "http://%s:%d/" % (host, port)
+
+    def start(self, port=0):
+        """
+        Start the server in a thread.
+
+        Parameters
+        ----------
+        port : int
+            Port to listen. Any free port is used if 0.
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, headers, data = fake.handle(url.path, query, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake Redmine REST API.")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--issues", type=int, default=100)
+    parser.add_argument("--journals", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeRedmine(args.projects, args.issues, args.journals,
+                       latency=args.latency, error_rate=args.error_rate).start(args.port)
+    print("Fake Redmine: %s" % fake.url, file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
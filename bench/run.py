@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+from pathlib import Path
+
+# Run from the top folder of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench.fake_redmine import FakeRedmine
+
+def default_font():
+    """
+    Font bundled with wordcloud. It has no Japanese glyphs, but the layout cost is the same.
+    """
+    import wordcloud
+    return str(Path(wordcloud.__file__).parent.joinpath("DroidSansMono.ttf"))
+
+def bench_extract(fake, work_dir, workers, rate):
+    """
+    Measure IssueExtractor against the fake server, and the full crawl again with the cached responses.
+    """
+    from src.extractor import IssueExtractor
+
+    config = {"redmine.url": fake.url, "fetch.workers": workers, "fetch.rate": rate,
+              "cache.http": str(work_dir.joinpath("http.db"))}
+    ie = IssueExtractor(data_dir=work_dir.joinpath("data"), config=config)
+    requests, bytes_sent = fake.requests, fake.bytes_sent
+    start = time.perf_counter()
+    ie.export_issues()
+    elapsed = time.perf_counter() - start
+    requests, bytes_sent = fake.requests - requests, fake.bytes_sent - bytes_sent
+
+    not_modified, recrawl_bytes = fake.not_modified, fake.bytes_sent
+    start = time.perf_counter()
+    ie.export_issues()
+    recrawl = time.perf_counter() - start
+    issues = fake.projects * fake.issues
+    return {
+        "issues": issues,
+        "requests": requests,
+        "bytes": bytes_sent,
+        "seconds": elapsed,
+        "issues_per_sec": issues / elapsed,
+        "recrawl_seconds": recrawl,
+        "recrawl_bytes": fake.bytes_sent - recrawl_bytes,
+        "recrawl_not_modified": fake.not_modified - not_modified,
+    }
+
+def bench_parse(work_dir, workers):
+    """
+    Measure ImageCreator.parse_text_data without the cache.
+    """
+    from src.creator import ImageCreator
+
+    ic = ImageCreator(workers=workers, config={"cache.tokens": ""})
+    lines = 0
+    tokens = 0
+    seconds = 0.0
+    for datafile in sorted(work_dir.joinpath("data").glob("*/issues.db")):
+        texts = list(ic.extract_text(datafile.parent))
+        lines += sum(len(text.splitlines()) for text in texts)
+        start = time.perf_counter()
+        _, total = ic.count_words_cached(texts)
+        seconds += time.perf_counter() - start
+        tokens += total
+    return {
+        "lines": lines,
+        "tokens": tokens,
+        "seconds": seconds,
+        "lines_per_sec": lines / seconds,
+        "tokens_per_sec": tokens / seconds,
+    }
+
+def bench_cleanup(work_dir, repeat=20):
+    """
+    Measure TextCleaner line by line and in batches of each issue.
+    """
+    from src.creator import ImageCreator
+
+    ic = ImageCreator(config={"cache.tokens": ""})
+    texts = []
+    for datafile in sorted(work_dir.joinpath("data").glob("*/issues.db")):
+        texts.extend(text.splitlines() for text in ic.extract_text(datafile.parent))
+    lines = sum(len(text) for text in texts) * repeat
+    chars = sum(len(line) for text in texts for line in text) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            for line in text:
+                ic.cleaner.clean(line)
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            ic.cleaner.clean_lines(text)
+    batch = time.perf_counter() - start
+    return {
+        "lines": lines,
+        "chars": chars,
+        "lines_per_sec": lines / single,
+        "batch_lines_per_sec": lines / batch,
+        "batch_chars_per_sec": chars / batch,
+    }
+
+def bench_tokenize(work_dir):
+    """
+    Compare the tokenizer backends on the same texts.
+    """
+    from src.creator import ImageCreator
+    from src.analyzer import BACKENDS, get_backend
+
+    ic = ImageCreator(config={"cache.tokens": ""})
+    lines = []
+    for datafile in sorted(work_dir.joinpath("data").glob("*/issues.db")):
+        for text in ic.extract_text(datafile.parent):
+            lines.extend(ic.cleanup_text(line) for line in text.splitlines())
+    results = {}
+    for name in BACKENDS:
+        start = time.perf_counter()
+        try:
+            backend = get_backend(name)
+        except ImportError:
+            results[name] = {"available": False}
+            continue
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        tokens = sum(len(backend.words(line)) for line in lines)
+        seconds = time.perf_counter() - start
+        results[name] = {
+            "available": True,
+            "load_seconds": load,
+            "lines": len(lines),
+            "tokens": tokens,
+            "seconds": seconds,
+            "lines_per_sec": len(lines) / seconds,
+        }
+    return results
+
+def bench_draw(work_dir, font):
+    """
+    Measure ImageCreator.draw_words_cloud from the counted words, and again for the unchanged words.
+    """
+    from src.creator import ImageCreator
+
+    ic = ImageCreator(config={"cache.tokens": "", "font.path": font})
+    data_dirs = sorted(datafile.parent for datafile in work_dir.joinpath("data").glob("*/issues.db"))
+    for data_dir in data_dirs:
+        ic.parse_text_data(data_dir, ic.extract_text(data_dir))
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        start = time.perf_counter()
+        for data_dir in data_dirs:
+            ic.draw_words_cloud(data_dir)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for data_dir in data_dirs:
+            ic.draw_words_cloud(data_dir)
+        unchanged = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    return {
+        "images": len(data_dirs),
+        "seconds": elapsed,
+        "seconds_per_image": elapsed / len(data_dirs),
+        "unchanged_seconds": unchanged,
+    }
+
+def run(args):
+    """
+    Run the benchmarks and return the results.
+    """
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+    }
+    os.environ.setdefault("REDMINE_API_KEY", "bench")
+    fake = FakeRedmine(args.projects, args.issues, args.journals, args.sentences,
+                       latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    with fake, tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        # Keep stdout for the results
+        with contextlib.redirect_stdout(sys.stderr):
+            results["extract"] = bench_extract(fake, work_dir, args.fetch_workers, args.fetch_rate)
+            if "cleanup" in args.stages:
+                results["cleanup"] = bench_cleanup(work_dir)
+            if "tokenize" in args.stages:
+                results["tokenize"] = bench_tokenize(work_dir)
+            if "parse" in args.stages:
+                results["parse"] = bench_parse(work_dir, args.parse_workers)
+            if "draw" in args.stages:
+                results["draw"] = bench_draw(work_dir, args.font or default_font())
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the extractor and the creator with a fake Redmine server.")
+    parser.add_argument("--projects", type=int, default=3, help="number of projects")
+    parser.add_argument("--issues", type=int, default=200, help="number of issues of each project")
+    parser.add_argument("--journals", type=int, default=3, help="number of journals of each issue")
+    parser.add_argument("--sentences", type=int, default=3, help="number of sentences of each text")
+    parser.add_argument("--latency", type=float, default=0.005, help="delay of each response in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="ratio of the requests answered by 503")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic text")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="fetch.workers of the extractor")
+    parser.add_argument("--fetch-rate", type=float, default=0, help="fetch.rate of the extractor (0: no limit)")
+    parser.add_argument("--parse-workers", type=int, default=1, help="parse.workers of the creator")
+    parser.add_argument("--font", help="font to draw (default: font bundled with wordcloud)")
+    parser.add_argument("--stages", nargs="+", default=["extract", "cleanup", "tokenize", "parse", "draw"],
+                        choices=["extract", "cleanup", "tokenize", "parse", "draw"], help="stages to measure")
+    parser.add_argument("--output", help="file to write the results (default: stdout)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -1,10 +1,315 @@
 # -*- coding: utf-8 -*-
-from src.extractor import IssueExtractor
-from src.creator import ImageCreator
+import sys
+import argparse
 
-if __name__ == '__main__':
-    ie = IssueExtractor()
-    ie.export_issues()
-    ic = ImageCreator()
-    ic.parse_and_draw()
+# Heavy libraries are imported in each command. (redminelib, janome, wordcloud)
+
+def shard_of(args):
+    """
+    Get the index and the number of the shards, or None if not sharded.
+    """
+    from src.shard import parse_shard
+
+    return parse_shard(args.shard) if args.shard else None
+
+def shard_folders(args):
+    """
+    Get the folders of the issue data and the images. (in shards/<i>-of-<N> if sharded)
+    """
+    from pathlib import Path
+    from src.shard import shard_dir
+
+    shard = shard_of(args)
+    root = shard_dir(*shard) if shard else Path(".")
+    return root.joinpath("data"), root.joinpath("image")
+
+def select_shard(args, ie):
+    """
+    Select the projects of the shard, and record the assignment in shard.json.
+    """
+    from src.shard import select_projects, write_summary
+
+    shard = shard_of(args)
+    if not shard:
+        return args.project
+    assignment = select_projects(ie, shard[0], shard[1], args.project)
+    write_summary(shard[0], shard[1], assignment)
+    return [name for name, index in sorted(assignment.items()) if index == shard[0]]
+
+def shard_projects(args):
+    """
+    Get the projects assigned to the shard by the last fetch, or the projects given by -p if not sharded.
+    """
+    from src.shard import read_assignment
+
+    shard = shard_of(args)
+    if not shard:
+        return args.project
+    # The data of the projects moved to another shard may be left
+    assignment = read_assignment(*shard) or {}
+    return [name for name, index in sorted(assignment.items())
+            if index == shard[0] and (not args.project or name in args.project)]
+
+def summarize_shard(args):
+    """
+    Write the word counts of the shard to shard.json to merge.
+    """
+    from src.shard import write_summary
+
+    shard = shard_of(args)
+    if shard:
+        write_summary(*shard)
+
+def fetch(args, config):
+    """
+    Fetch the issues from Redmine.
+    """
+    from src.extractor import IssueExtractor
+
+    data_dir, _ = shard_folders(args)
+    with IssueExtractor(data_dir=data_dir, config=config) as ie:
+        projects = select_shard(args, ie)
+        if args.shard and not projects:
+            print("No projects in the shard")
+            return
+        ie.export_issues(incremental=args.incremental, projects=projects, resume=args.resume)
+
+def parse(args, config):
+    """
+    Parse the issues and write words.json.
+    """
+    from src.creator import ImageCreator
+
+    ic = ImageCreator(debug=args.debug, config=config, stages=("parse",))
+    ic.data_dir, ic.image_dir = shard_folders(args)
+    projects = shard_projects(args)
+    if args.shard and not projects:
+        print("No projects in the shard")
+    else:
+        ic.parse_and_draw(projects=projects)
+    summarize_shard(args)
+
+def draw(args, config):
+    """
+    Draw WordCloud images from words.json.
+    """
+    from src.creator import ImageCreator
+
+    ic = ImageCreator(config=config, stages=("draw",), window=args.window)
+    ic.data_dir, ic.image_dir = shard_folders(args)
+    projects = shard_projects(args)
+    if args.shard and not projects:
+        print("No projects in the shard")
+        return
+    ic.parse_and_draw(projects=projects)
+
+def run(args, config):
+    """
+    Fetch the issues, parse them and draw WordCloud images.
+    """
+    from src.extractor import IssueExtractor
+    from src.creator import ImageCreator
+
+    data_dir, image_dir = shard_folders(args)
+    ic = ImageCreator(debug=args.debug, config=config)
+    ic.data_dir, ic.image_dir = data_dir, image_dir
+    with IssueExtractor(data_dir=data_dir, config=config) as ie:
+        projects = select_shard(args, ie)
+        if args.shard and not projects:
+            print("No projects in the shard")
+        elif args.pipeline:
+            from src.pipeline import run_pipeline
+            run_pipeline(ie, ic, args.incremental, config.get("pipeline.queue", 2), projects=projects,
+                         resume=args.resume)
+        else:
+            ie.export_issues(incremental=args.incremental, projects=projects, resume=args.resume)
+            ic.parse_and_draw(projects=projects)
+    summarize_shard(args)
+
+def merge(args, config):
+    """
+    Merge the word counts of the shards into shards/words.json without parsing the text again.
+    """
+    import json
+    from pathlib import Path
+    from src.shard import merge_summaries
 
+    paths = args.summary or sorted(Path("shards").glob("*/shard.json"))
+    summaries = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            summaries.append(json.load(f))
+    merged = merge_summaries(summaries)
+    for name in merged["missing"]:
+        print("Project without words: %s" % name)
+
+    merge_dir = Path("shards")
+    merge_dir.mkdir(exist_ok=True)
+    wlist = merged.pop("words")
+    with open(merge_dir.joinpath("words.json"), "w", encoding="utf-8") as f:
+        f.write(json.dumps(wlist.most_common(), indent=2, ensure_ascii=False))
+    with open(merge_dir.joinpath("merged.json"), "w", encoding="utf-8") as f:
+        f.write(json.dumps(merged, indent=2, ensure_ascii=False))
+    print("Merged %d shards, %d projects: %s" % (merged["count"], len(merged["projects"]), merge_dir))
+    if args.draw:
+        from src.creator import ImageCreator
+        ic = ImageCreator(config=config, stages=("draw",))
+        ic.draw_words_cloud(merge_dir, wlist, "all")
+
+def watch(args, config):
+    """
+    Refresh the images of the updated projects on the interval until stopped.
+    """
+    import signal
+    import threading
+    from src.extractor import IssueExtractor
+    from src.creator import ImageCreator
+    from src.metrics import metrics
+    from src.watch import watch as watch_projects
+
+    ic = ImageCreator(config=config)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+
+    def on_refresh(changes):
+        # Keep the metrics up to date while watching
+        if metrics.enabled:
+            metrics.write(config.get("metrics.output", "metrics"))
+
+    interval = args.interval or float(config.get("watch.interval", 60))
+    with IssueExtractor(config=config) as ie:
+        watch_projects(ie, ic, interval, projects=args.project, stop=stop, on_refresh=on_refresh)
+
+def report(args, config):
+    """
+    Report the top words and the trend of the window from the month index.
+    """
+    import json
+    from pathlib import Path
+    from src.creator import ImageCreator
+
+    data_dirs = sorted(indexfile.parent for indexfile in Path("data").glob("*/words.db"))
+    if args.project:
+        data_dirs = [data_dir for data_dir in data_dirs if data_dir.name in args.project]
+    ic = ImageCreator(config=config, stages=(), window=args.window)
+    text = json.dumps(ic.report_window(data_dirs, args.top), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+def export(args, config):
+    """
+    Export the issues in the segment files to the files of each issue.
+    """
+    from pathlib import Path
+    from src.segment import export_issue_files
+
+    for segmentfile in sorted(Path("data").glob("*/issues.seg")):
+        data_dir = segmentfile.parent
+        if args.project and (data_dir.name not in args.project):
+            continue
+        count = export_issue_files(data_dir)
+        print("%s: %d issues" % (data_dir.name, count))
+
+def build_parser():
+    """
+    Build the parser of the command line.
+    """
+    parser = argparse.ArgumentParser(description="Draw WordCloud images from Redmine issues.")
+    parser.add_argument("--metrics", action="store_true",
+                        help="write the metrics of each project to metrics/metrics.json and metrics.prom")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    # Options of each command
+    project = argparse.ArgumentParser(add_help=False)
+    project.add_argument("-p", "--project", action="append",
+                         help="identifier of the project (repeatable, default: all projects)")
+    incremental = argparse.ArgumentParser(add_help=False)
+    incremental.add_argument("--incremental", action="store_true",
+                             help="fetch only the issues updated since the last run")
+    incremental.add_argument("--resume", action="store_true",
+                             help="continue the interrupted fetch from the last persisted issue")
+    shard = argparse.ArgumentParser(add_help=False)
+    shard.add_argument("--shard",
+                       help="process the part i of N parts of the projects (e.g. 1/3) and write in shards/i-of-N")
+    debug = argparse.ArgumentParser(add_help=False)
+    debug.add_argument("--debug", action="store_true",
+                       help="export the intermediate text.txt and words.txt")
+
+    command = commands.add_parser("fetch", parents=[project, incremental, shard], help="fetch the issues from Redmine")
+    command.set_defaults(func=fetch)
+    command = commands.add_parser("parse", parents=[project, debug, shard], help="parse the issues and write words.json")
+    command.set_defaults(func=parse)
+    command = commands.add_parser("draw", parents=[project, shard], help="draw WordCloud images from words.json")
+    command.add_argument("--window",
+                         help="months to draw from the month index: YYYY-MM:YYYY-MM, YYYY-MM or Nm (last N months)")
+    command.set_defaults(func=draw)
+    command = commands.add_parser("run", parents=[project, incremental, debug, shard], help="fetch, parse and draw (default)")
+    command.add_argument("--pipeline", action="store_true",
+                         help="draw each project as soon as its issues are fetched")
+    command.set_defaults(func=run)
+    command = commands.add_parser("watch", parents=[project],
+                                  help="keep running and refresh the images of the updated projects")
+    command.add_argument("--interval", type=float,
+                         help="seconds between the refreshes (default: watch.interval in the config, or 60)")
+    command.set_defaults(func=watch)
+    command = commands.add_parser("export", parents=[project],
+                                  help="export data/<PROJECT_ID>/issues.seg to data/<PROJECT_ID>/issues/<ISSUE_ID>.json")
+    command.set_defaults(func=export)
+    command = commands.add_parser("report", parents=[project],
+                                  help="report the top words and the rising and falling words of the window")
+    command.add_argument("--window", required=True,
+                         help="months to report: YYYY-MM:YYYY-MM, YYYY-MM or Nm (last N months)")
+    command.add_argument("--top", type=int, default=20, help="number of words to report (default: 20)")
+    command.add_argument("--output", help="file to write the report in JSON (default: stdout)")
+    command.set_defaults(func=report)
+    command = commands.add_parser("merge", help="merge the word counts of the shards into shards/words.json")
+    command.add_argument("summary", nargs="*", help="shard.json of each shard (default: shards/*/shard.json)")
+    command.add_argument("--draw", action="store_true", help="draw the merged words to image/all.png")
+    command.set_defaults(func=merge)
+    return parser
+
+# Commands, and the options followed by their value
+COMMANDS = ("fetch", "parse", "draw", "run", "watch", "export", "report", "merge")
+VALUE_OPTIONS = ("-p", "--project", "--shard", "--window", "--interval", "--top", "--output")
+
+def with_command(argv):
+    """
+    Insert the run command if the command is not given. (e.g. main.py -p foo)
+    Only the first positional argument is the command, so a project may have the name of a command.
+    """
+    if "-h" in argv or "--help" in argv:
+        return argv
+    value = False
+    for arg in argv:
+        if value:
+            value = False
+        elif arg.startswith("-"):
+            value = arg in VALUE_OPTIONS
+        elif arg in COMMANDS:
+            return argv
+        else:
+            break
+    return [arg for arg in argv if arg == "--metrics"] + ["run"] + [arg for arg in argv if arg != "--metrics"]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    # Run all stages without the command
+    args = parser.parse_args(with_command(argv))
+
+    from src.utils import read_config, peak_memory
+    from src.metrics import metrics
+
+    config = read_config()
+    metrics.enabled = args.metrics
+    args.func(args, config)
+    metrics.maximum("memory_peak_bytes", peak_memory())
+    if args.metrics:
+        metrics.write(config.get("metrics.output", "metrics"))
+
+if __name__ == '__main__':
+    main()
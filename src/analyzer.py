@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import re
+import janome
+from abc import ABC, abstractmethod
+from janome.charfilter import *
+from janome.analyzer import Analyzer
+from janome.tokenizer import Tokenizer
+from janome.tokenfilter import *
+
+# Filter to replace all numeric chars to '0'.
+class NumericReplaceFilter(TokenFilter):
+    def apply(self, tokens):
+        for token in tokens:
+            parts = token.part_of_speech.split(',')
+            if (parts[0] == '名詞' and parts[1] == '数'):
+                token.surface = '0'
+                token.base_form = '0'
+                token.reading = 'ゼロ'
+                token.phonetic = 'ゼロ'
+            yield token
+
+# Filter to remove single character.
+class OneCharacterReplaceFilter(TokenFilter):
+    def apply(self, tokens):
+        for token in tokens:
+            if re.match('^[あ-んア-ンa-zA-Z0-9ー]$', token.surface):
+                continue
+            yield token
+
+# Part of speech to count
+KEEP_POS = ['名詞', '動詞', '形容詞', '副詞']
+
+class TokenizerBackend(ABC):
+    """
+    Morphological analyzer to get the words to count.
+    A backend is created once per process by get_backend().
+    """
+    # Name in the config (parse.backend)
+    name = None
+
+    @abstractmethod
+    def signature(self):
+        """
+        Describe the analyzer and its filters.
+        The cached counts are used only if the signature is the same.
+
+        Returns
+        ----------
+        signature : String
+            Versions and filters to get the words
+        """
+
+    @abstractmethod
+    def words(self, line):
+        """
+        Get the words to count.
+
+        Parameters
+        ----------
+        line : String
+            Cleaned up line of the text
+
+        Returns
+        ----------
+        words : list of String
+            Base forms of the words
+        """
+
+class JanomeBackend(TokenizerBackend):
+    """
+    Janome analyzer. (default)
+    The system dictionary is memory-mapped, so its pages are shared by the processes.
+    """
+    name = "janome"
+
+    def __init__(self):
+        self.analyzer = create_analyzer()
+
+    def signature(self):
+        return "janome=%s;char=UnicodeNormalize;token=CompoundNoun,POSKeep(%s)" % (
+            janome.__version__, ",".join(KEEP_POS))
+
+    def words(self, line):
+        return [token.base_form for token in self.analyzer.analyze(line) if token.base_form != '']
+
+class FugashiBackend(TokenizerBackend):
+    """
+    MeCab analyzer by fugashi with UniDic. (optional, faster than Janome)
+    The same filters as Janome are applied: the nouns in a row are joined, and KEEP_POS are kept.
+    The words may differ from Janome because the dictionary is different.
+    """
+    name = "fugashi"
+
+    def __init__(self):
+        import fugashi
+        import unicodedata
+        self.fugashi = fugashi
+        self.normalize = lambda text: unicodedata.normalize("NFKC", text)
+        self.tagger = fugashi.Tagger()
+
+    def signature(self):
+        return "fugashi=%s;dic=%s;char=NFKC;token=CompoundNoun,POSKeep(%s)" % (
+            self.fugashi.__version__, self.tagger.dictionary_info[0]["filename"], ",".join(KEEP_POS))
+
+    def words(self, line):
+        words = []
+        noun = ""
+        for word in self.tagger(self.normalize(line)):
+            pos = word.feature.pos1
+            if pos == "名詞":
+                noun += word.surface
+                continue
+            if noun:
+                words.append(noun)
+                noun = ""
+            if pos in KEEP_POS:
+                words.append(word.feature.lemma or word.surface)
+        if noun:
+            words.append(noun)
+        return words
+
+# Backends by name
+BACKENDS = {backend.name: backend for backend in (JanomeBackend, FugashiBackend)}
+
+# Backends created in this process
+_backends = {}
+
+def get_backend(name="janome"):
+    """
+    Get the backend of this process. It is created at the first call.
+
+    Parameters
+    ----------
+    name : String
+        Name of the backend, or "auto" to use fugashi if installed
+
+    Returns
+    ----------
+    backend : TokenizerBackend
+        Backend to get the words
+    """
+    if name == "auto":
+        try:
+            return get_backend("fugashi")
+        except ImportError:
+            return get_backend("janome")
+    if name not in BACKENDS:
+        raise ValueError("Unknown tokenizer backend: %s" % name)
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+def create_analyzer():
+    """
+    Create the analyzer to get the words to count.
+
+    Returns
+    ----------
+    analyzer : Analyzer
+        Janome analyzer with the char and token filters
+    """
+    # Create the Tokenizer. The dictionary is memory-mapped.
+    tokenizer = Tokenizer(mmap=True)
+
+    # Charater filter for Janome.
+    char_filters = [ UnicodeNormalizeCharFilter() ]
+
+    # Set up the filters
+    token_filters = [
+                    # NumericReplaceFilter(),
+                    CompoundNounFilter(),
+                    POSKeepFilter(KEEP_POS),
+                    # OneCharacterReplaceFilter()
+                    ]
+
+    analyzer = Analyzer(char_filters=char_filters, tokenizer=tokenizer, token_filters=token_filters)
+    return analyzer
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    key TEXT PRIMARY KEY,
+    words TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS counts_used ON counts (used);
+"""
+
+class TokenCache:
+    """
+    Persistent cache of the word counts of each text.
+
+    Parameters
+    ----------
+    path : Path
+        Database file of the cache
+    signature : String
+        Configuration of the analyzer. Counts of other configuration are not used.
+    max_bytes : int
+        Maximum size of the cached counts. Least recently used counts are evicted.
+    """
+    def __init__(self, path, signature, max_bytes=256 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.signature = signature
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__used = set()
+        self.__conn = sqlite3.connect(str(self.path), timeout=30)
+        self.__conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def key(self, text):
+        """
+        Make the key of the text.
+
+        Parameters
+        ----------
+        text : String
+            Text to count the words
+
+        Returns
+        ----------
+        key : String
+            Hash of the analyzer configuration and the text
+        """
+        h = hashlib.sha256(self.signature.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Get the cached counts.
+
+        Parameters
+        ----------
+        key : String
+            Key made by key()
+
+        Returns
+        ----------
+        (words, total) : tuple of list and int
+            List of [word, count] in the order of occurrence and the total number of words,
+            or None if not cached.
+        """
+        row = self.__conn.execute("SELECT words, total FROM counts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__used.add(key)
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, words, total):
+        """
+        Put the counts to the cache.
+
+        Parameters
+        ----------
+        key : String
+            Key made by key()
+        words : list
+            List of [word, count] in the order of occurrence
+        total : int
+            Total number of words
+        """
+        value = json.dumps(words, ensure_ascii=False, separators=(",", ":"))
+        with self.__conn:
+            self.__conn.execute(
+                "INSERT OR REPLACE INTO counts VALUES (?, ?, ?, ?, ?)",
+                (key, value, total, len(value.encode("utf-8")), time.time()))
+
+    def evict(self):
+        """
+        Evict the least recently used counts until the cache fits in max_bytes.
+
+        Returns
+        ----------
+        count : int
+            Number of evicted counts
+        """
+        size = self.__conn.execute("SELECT COALESCE(SUM(size), 0) FROM counts").fetchone()[0]
+        if size <= self.max_bytes:
+            return 0
+        keys = []
+        for key, n in self.__conn.execute("SELECT key, size FROM counts ORDER BY used"):
+            if size <= self.max_bytes:
+                break
+            keys.append((key,))
+            size -= n
+        with self.__conn:
+            self.__conn.executemany("DELETE FROM counts WHERE key = ?", keys)
+        return len(keys)
+
+    def close(self):
+        """
+        Record the access time of the used counts, evict the old counts and close the cache.
+        """
+        if self.__conn is None:
+            return
+        now = time.time()
+        with self.__conn:
+            self.__conn.executemany("UPDATE counts SET used = ? WHERE key = ?", [(now, key) for key in self.__used])
+        self.__used.clear()
+        self.evict()
+        self.__conn.close()
+        self.__conn = None
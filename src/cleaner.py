@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import re
+import json
+import hashlib
+
+# Patterns of the text to remove. They should not match the line break.
+# The words and the separators are different characters, so a failed match does not
+# backtrack into the words. The email address starts only at the head of a token,
+# not inside the token checked already. (e.g. "a.a.a.a")
+DEFAULT_PATTERNS = [
+    # URL
+    r'https?://[\w/:%#\$&\?\(\)~\.=\+\-]+',
+    # Email address
+    r'(?<!\w)(?<!\w[-+.])\w+(?:[-+.]\w+)*@\w+(?:-\w+)*(?:\.\w+(?:-\w+)*)+',
+]
+
+# Characters to remove. (symbols, box drawings and circled numbers)
+DEFAULT_CHARS = ["!-/", ":-@", "[-`", "{-~", "■-♯", "①-⑨"]
+
+class TextCleaner:
+    """
+    Remove unnecessary text before the tokenization.
+    The patterns are compiled once and the characters are removed by a translate table.
+
+    Parameters
+    ----------
+    patterns : list of String
+        Regular expressions of the text to remove, applied in order
+    chars : list of String
+        Characters to remove. Each item is a character or a range. (e.g. "a-z")
+    """
+    def __init__(self, patterns=None, chars=None):
+        self.patterns = list(DEFAULT_PATTERNS if patterns is None else patterns)
+        self.chars = list(DEFAULT_CHARS if chars is None else chars)
+        self.__regexes = [re.compile(pattern) for pattern in self.patterns]
+        self.__table = self.translate_table(self.chars)
+
+    @staticmethod
+    def translate_table(chars):
+        """
+        Make the table to replace the characters with a space.
+
+        Parameters
+        ----------
+        chars : list of String
+            Characters or ranges of the characters
+
+        Returns
+        ----------
+        table : dict
+            Table for str.translate()
+        """
+        table = {}
+        for item in chars:
+            if len(item) == 3 and item[1] == "-":
+                first, last = ord(item[0]), ord(item[2])
+            else:
+                assert len(item) == 1, "Character or range should be given: %s" % item
+                first = last = ord(item)
+            for code in range(first, last + 1):
+                table[code] = " "
+        return table
+
+    def signature(self):
+        """
+        Describe the patterns and the characters.
+        The cached counts are used only if the signature is the same.
+
+        Returns
+        ----------
+        signature : String
+            Hash of the configuration
+        """
+        config = json.dumps([self.patterns, self.chars], ensure_ascii=False)
+        return "cleanup=%s" % hashlib.sha1(config.encode("utf-8")).hexdigest()[:12]
+
+    def clean(self, text):
+        """
+        Remove unnecessary text from the input text
+
+        Parameters
+        ----------
+        text : String
+            Text to remove some words
+
+        Returns
+        ----------
+        text : String
+            Text whose removed parts are replaced with spaces
+        """
+        for regex in self.__regexes:
+            text = regex.sub(' ', text)
+        return text.translate(self.__table)
+
+    def clean_lines(self, lines):
+        """
+        Remove unnecessary text from the lines at once.
+
+        Parameters
+        ----------
+        lines : list of String
+            Lines of the text
+
+        Returns
+        ----------
+        lines : list of String
+            Cleaned lines
+        """
+        if not lines:
+            return []
+        return self.clean("\n".join(lines)).split("\n")
@@ -1,20 +1,197 @@
 # -*- coding: utf-8 -*-
-import re
 import os
-import pickle
+import atexit
+import multiprocessing
 from pathlib import Path
-from janome.charfilter import *
-from janome.analyzer import Analyzer
-from janome.tokenizer import Tokenizer
-from janome.tokenfilter import *
-from gensim import corpora
-from wordcloud import WordCloud
 import json
-from src.utils import setup_folder
+import hashlib
+import traceback
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import Future, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from src.utils import setup_folder, read_config, peak_memory
+from src.store import IssueStore
+from src.cache import TokenCache
+from src.cleaner import TextCleaner
+from src.wordindex import WordIndex, month_of, parse_window
+from src.sketch import SpaceSaving
+from src.metrics import metrics
+
+# Creator and tokenizer backend of the worker process
+_worker_creator = None
+_worker_backend = None
+
+# Process pools of parallel tokenization. They are kept to load the dictionary once per process.
+_pools = {}
+
+def _init_worker(backend="janome", cleaner=None):
+    """
+    Initialize the worker process of parallel tokenization.
+
+    Parameters
+    ----------
+    backend : String
+        Name of the tokenizer backend
+    cleaner : TextCleaner
+        Cleaner of the parent process
+    """
+    from src.analyzer import get_backend
+
+    global _worker_creator, _worker_backend
+    _worker_creator = ImageCreator(workers=1, config={})
+    if cleaner is not None:
+        _worker_creator.cleaner = cleaner
+    _worker_backend = get_backend(backend)
+
+def _mp_context():
+    """
+    Get the start method of the worker processes.
+    The pipeline starts them while the fetcher thread is running, so they are not forked
+    from the process with the threads. (forkserver, or spawn if not supported)
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _get_pool(workers, backend, cleaner):
+    """
+    Get the process pool of parallel tokenization. It is created at the first call.
+
+    Parameters
+    ----------
+    workers : int
+        Number of processes
+    backend : String
+        Name of the tokenizer backend
+    cleaner : TextCleaner
+        Cleaner of the text
+
+    Returns
+    ----------
+    executor : ProcessPoolExecutor
+        Pool whose processes have the backend
+    """
+    key = (workers, backend, cleaner.signature())
+    if key not in _pools:
+        _pools[key] = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                          initializer=_init_worker, initargs=(backend, cleaner))
+    return _pools[key]
+
+def _shutdown_pools():
+    """
+    Stop the processes of parallel tokenization at the exit. (e.g. after watching)
+    """
+    while _pools:
+        _, executor = _pools.popitem()
+        executor.shutdown()
+
+atexit.register(_shutdown_pools)
+
+def _count_batch(texts):
+    """
+    Count the words of the batch in the worker process.
+
+    Parameters
+    ----------
+    texts : list of String
+        Text data to parse
+
+    Returns
+    ----------
+    counts : list of tuple of Counter and int
+        Number of occurrences of each word and the total number of words for each text
+    """
+    return _worker_creator.count_texts(_worker_backend, texts)
+
+def _parse_and_draw_project(creator, data_dir, metrics_enabled=False):
+    """
+    Parse text and draw WordCloud figure for one project in the worker process.
+
+    Parameters
+    ----------
+    creator : ImageCreator
+        Creator with the settings of the parent process
+    data_dir : Path
+        Directory which have issue data
+    metrics_enabled : bool
+        Record the metrics to return them to the parent process
+
+    Returns
+    ----------
+    (error, snapshot) : tuple of String and metrics snapshot
+        Error message, or None if succeeded, and the metrics of the project
+    """
+    # Projects are already processed in parallel
+    creator.workers = 1
+    metrics.enabled = metrics_enabled
+    metrics.reset()
+    error = creator.try_parse_and_draw_for_project(data_dir)
+    # The worker process is reused, so the peak is for the all projects in the worker
+    metrics.maximum("worker_memory_peak_bytes", peak_memory())
+    return error, metrics.snapshot()
 
 class ImageCreator:
 
-    def extract_text(self, data_dir):
+    def __init__(self, debug=False, workers=None, config=None, stages=("parse", "draw"), window=None):
+        # Export the intermediate text and words files (for debug)
+        self.debug = debug
+        # Window of the months to draw from the month index. (e.g. "2024-01:2024-03", "3m")
+        # All counts in words.json are drawn if not given.
+        self.window = window
+        # Stages to run for each project. The words are read from words.json if not parsed.
+        self.stages = tuple(stages)
+        # Folders of the issue data and the images. (changed for each shard)
+        self.data_dir = Path("data")
+        self.image_dir = Path("image")
+
+        # Number of processes to parse the text, and number of issues sent to a process at once
+        # Config values. Read from config/projects.json if not given.
+        if config is None:
+            config = read_config()
+        self.workers = max(1, int(workers or config.get("parse.workers", 1)))
+        self.batch_size = int(config.get("parse.batch_size", 64))
+
+        # Morphological analyzer: "janome", "fugashi" or "auto" (fugashi if installed)
+        self.backend = config.get("parse.backend", "janome")
+
+        # Patterns and characters removed before the tokenization
+        self.cleaner = TextCleaner(config.get("cleanup.patterns"), config.get("cleanup.chars"))
+
+        # Number of processes to draw the projects
+        self.draw_workers = max(1, int(config.get("draw.workers", 1)))
+
+        # Japanese font to draw. The default font of the OS is used if not given.
+        self.font_path = config.get("font.path")
+
+        # Number of words to show on image
+        self.max_words = int(config.get("draw.max_words", 200))
+
+        # Size of the image, and the widths of the other images drawn from the same layout. (e.g. thumbnails)
+        self.width = int(config.get("draw.width", 1200))
+        self.height = int(config.get("draw.height", 800))
+        self.sizes = [int(width) for width in config.get("draw.sizes", [])]
+
+        # Keys of the drawn images. The image is not drawn again if the words and the settings are the same.
+        # Disabled if the path is empty.
+        self.render_cache_path = config.get("cache.render", "cache/render")
+
+        # Counting of the words: "exact", or "topk" to keep only the frequent words in bounded memory
+        self.count_mode = config.get("count.mode", "exact")
+        assert self.count_mode in ("exact", "topk"), "count.mode should be exact or topk."
+        # Number of the words kept by "topk". The counts of the top words are more accurate if larger.
+        self.count_capacity = int(config.get("count.capacity", self.max_words * 10))
+
+        # Read the stop words not to show on image.
+        self.stop_words = set()
+        stop_word_file = Path("config/stopwords.txt")
+        if stop_word_file.exists():
+            with open(stop_word_file, 'r', encoding='utf-8') as file:
+                self.stop_words = set(word.lower() for word in file.read().split('\n') if word)
+
+        # Cache of the word counts of each issue. Disabled if the path is empty.
+        self.cache_path = config.get("cache.tokens", "cache/tokens.db")
+        self.cache_max_bytes = int(config.get("cache.tokens.max_bytes", 256 * 1024 * 1024))
+
+    def extract_text(self, data_dir, by_month=False):
         """
         Extract text data from issue data
 
@@ -22,40 +199,62 @@ class ImageCreator:
         ----------
         data_dir : Path
             Directory which have issue data
+        by_month : bool
+            Yield the subject and description, each note and each comment separately
+            with the month when it is written.
+
+        Yields
+        ----------
+        text : String
+            Text of one issue. Subject, description, notes and comments are separated by newline.
+        (month, text) : tuple of String
+            Month (YYYY-MM) and the text, if by_month is True
         """
         assert data_dir.exists() and data_dir.is_dir(), "Data folder should exist."
 
-        datafile = data_dir.joinpath("issues.pickle")
+        datafile = data_dir.joinpath("issues.db")
         print("read issues: %s" % datafile)
         if not datafile.exists():
             return
-        # Load issue data
-        with open(datafile, "rb") as f:
-            issues = pickle.load(f)
+
+        # Export the text file (for debug)
+        textfile = None
+        if self.debug:
+            textfile = open(data_dir.joinpath("text.txt"), 'w', encoding='utf-8')
+            print("write text: %s" % textfile.name)
 
         # Parse the issue data
-        text = ""
+        counter_issues = 0
         counter_notes = 0
         counter_comments = 0
-        for issue in issues:
-            text += issue.subject + "\n"
-            text += issue.description + "\n"
-            for journal in issue.journals:
-                if (hasattr(journal, "notes")) and (journal.notes is not None):
-                    # print(journal.notes))
-                    text += journal.notes + "\n"
-                    counter_notes += 1
-            for changeset in issue.changesets:
-                text += changeset["comments"] + "\n"
-                counter_comments += 1
-        print("total issues: %d, notes: %d, comments: %d" % (len(issues), counter_notes, counter_comments))
-
-        # Export the text file (for debug)
-        textfile = data_dir.joinpath("text.txt")
-        print("write text: %s" % textfile)
-        with open(textfile, 'w', encoding='utf-8') as f:
-            f.write(text)
-        return text
+        try:
+            with IssueStore(datafile) as store:
+                for issue in store.iter_issues():
+                    month = month_of(issue["created_on"])
+                    entries = [(month, issue["subject"] + "\n" + issue["description"])]
+                    counter_issues += 1
+                    for journal in issue["journals"]:
+                        entries.append((month_of(journal["created_on"]) or month, journal["notes"]))
+                        counter_notes += 1
+                    for changeset in issue["changesets"]:
+                        entries.append((month_of(changeset["committed_on"]) or month, changeset["comments"]))
+                        counter_comments += 1
+                    if by_month:
+                        for entry_month, text in entries:
+                            text += "\n"
+                            if textfile is not None:
+                                textfile.write(text)
+                            yield entry_month, text
+                        continue
+                    text = "\n".join(text for _, text in entries) + "\n"
+                    if textfile is not None:
+                        textfile.write(text)
+                    yield text
+        finally:
+            if textfile is not None:
+                textfile.close()
+        print("total issues: %d, notes: %d, comments: %d" % (counter_issues, counter_notes, counter_comments))
+        metrics.count("issues_parsed_total", counter_issues, project=data_dir.name)
 
     def cleanup_text(self, text):
         """
@@ -66,16 +265,140 @@ class ImageCreator:
         text : String
             Text to remove some words
         """
-        # Remove URL
-        text = re.sub(r'https?://[\w/:%#\$&\?\(\)~\.=\+\-]+', ' ', text)
-        # Remove email address
-        text = re.sub(r'\w+([-+.]\w+)*@\w+([-.]\w+)*\.\w+([-.]\w+)*', ' ', text)
-        # Remove symbols
-        text = re.sub(r'[!-/:-@[-`{-~]', ' ', text)
-        text = re.sub(r'[■-♯①-⑨]', ' ', text)
-        return text
+        # Remove URL, email address and symbols
+        return self.cleaner.clean(text)
+
+    def count_words(self, backend, texts, wordsfile=None):
+        """
+        Count the words of the text data
+
+        Parameters
+        ----------
+        backend : TokenizerBackend
+            Backend made by get_backend()
+        texts : iterable of String
+            Text data to parse
+        wordsfile : file
+            File to write the words (for debug)
+
+        Returns
+        ----------
+        (wlist, total) : tuple of Counter and int
+            Number of occurrences of each word, and the total number of words
+        """
+        wlist = Counter()
+        total = 0
+        for text in texts:
+            # Clean up the lines of the text at once
+            for line in self.cleaner.clean_lines(text.splitlines()):
+                # Parse the sentence and get the words.
+                words = backend.words(line)
+                wlist.update(words)
+                total += len(words)
+                if wordsfile is not None:
+                    wordsfile.writelines([word+' ' for word in words])
+        return wlist, total
+
+    def count_texts(self, backend, texts):
+        """
+        Count the words of each text
+
+        Parameters
+        ----------
+        backend : TokenizerBackend
+            Backend made by get_backend()
+        texts : iterable of String
+            Text data to parse
+
+        Returns
+        ----------
+        counts : list of tuple of Counter and int
+            Number of occurrences of each word and the total number of words for each text
+        """
+        return [self.count_words(backend, [text]) for text in texts]
+
+    def count_words_cached(self, texts, cache=None):
+        """
+        Count the words of the text data. Only the texts not in the cache are parsed,
+        on the worker processes if configured. The result is the same as count_words().
+
+        Parameters
+        ----------
+        texts : iterable of String
+            Text data to parse
+        cache : TokenCache
+            Cache of the word counts of each text
+
+        Returns
+        ----------
+        (wlist, total) : tuple of Counter and int
+            Number of occurrences of each word, and the total number of words
+        """
+        wlist = Counter()
+        total = 0
+        for counter, n in self.iter_counts(texts, cache):
+            wlist.update(counter)
+            total += n
+        return wlist, total
+
+    def iter_counts(self, texts, cache=None):
+        """
+        Count the words of each text in order. Only the texts not in the cache are parsed,
+        on the worker processes if configured.
+
+        Parameters
+        ----------
+        texts : iterable of String
+            Text data to parse
+        cache : TokenCache
+            Cache of the word counts of each text
 
-    def parse_text_data(self, data_dir, text):
+        Yields
+        ----------
+        (counter, n) : tuple of Counter and int
+            Number of occurrences of each word, and the number of words of the text
+        """
+        texts = iter(texts)
+        backend = None
+        executor = None
+        if self.workers > 1:
+            executor = _get_pool(self.workers, self.backend, self.cleaner)
+        # Keep a bounded number of batches in flight, and merge them in order.
+        window = self.workers * 2
+        pending = deque()
+        while True:
+            batch = list(islice(texts, self.batch_size))
+            if batch:
+                keys = [None] * len(batch)
+                cached = [None] * len(batch)
+                if cache is not None:
+                    keys = [cache.key(text) for text in batch]
+                    cached = [cache.get(key) for key in keys]
+                misses = [text for text, hit in zip(batch, cached) if hit is None]
+                if executor is not None:
+                    future = executor.submit(_count_batch, misses)
+                else:
+                    if backend is None:
+                        from src.analyzer import get_backend
+                        backend = get_backend(self.backend)
+                    future = Future()
+                    future.set_result(self.count_texts(backend, misses))
+                pending.append((keys, cached, future))
+            if pending and ((len(pending) >= window) or (not batch)):
+                keys, cached, future = pending.popleft()
+                counts = iter(future.result())
+                for key, hit in zip(keys, cached):
+                    if hit is None:
+                        counter, n = next(counts)
+                        if cache is not None:
+                            cache.put(key, list(counter.items()), n)
+                    else:
+                        counter, n = Counter(dict(hit[0])), hit[1]
+                    yield counter, n
+            elif not batch:
+                break
+
+    def parse_text_data(self, data_dir, texts):
         """
         Parse text data for one project
 
@@ -83,85 +406,231 @@ class ImageCreator:
         ----------
         data_dir : Path
             Directory which have issue data
-        text : String
-            Text data to parse
+        texts : iterable of String or tuple of String
+            Text data to parse. It is consumed one by one.
+            The pairs of the month and the text are also counted in the month index (words.db).
+
+        Returns
+        ----------
+        wlist : Counter
+            Number of occurrences of each word
         """
         assert data_dir.exists() and data_dir.is_dir(), "Data folder should exist."
 
-        if (not text) or (len(text) == 0):
+        # Export the words file (for debug)
+        wordsfile = None
+        if self.debug:
+            wordsfile = open(data_dir.joinpath("words.txt"), 'w', encoding='utf-8')
+
+        # Word counts of the project and each month. The sketch keeps the frequent words only.
+        topk = (self.count_mode == "topk")
+        wlist = SpaceSaving(self.count_capacity) if topk else Counter()
+        total = 0
+        buckets = {}
+        months = deque()
+        by_month = False
+
+        def split(items):
+            # Keep the month of each text in order to add its counts to the bucket
+            nonlocal by_month
+            for item in items:
+                if isinstance(item, tuple):
+                    by_month = True
+                    month, text = item
+                else:
+                    month, text = None, item
+                months.append(month)
+                yield text
+
+        def merge(counts):
+            nonlocal total
+            for counter, n in counts:
+                month = months.popleft()
+                total += n
+                if topk:
+                    # The stop words should not take the counters
+                    counter = self.remove_stop_words(counter)
+                wlist.update(counter)
+                if month is not None:
+                    if month not in buckets:
+                        buckets[month] = SpaceSaving(self.count_capacity) if topk else Counter()
+                    buckets[month].update(counter)
+
+        # Count the words line by line
+        from src.analyzer import get_backend
+        texts = split(texts)
+        try:
+            if wordsfile is not None:
+                backend = get_backend(self.backend)
+                merge(self.count_words(backend, [text], wordsfile) for text in texts)
+            elif self.cache_path:
+                signature = "%s;%s" % (get_backend(self.backend).signature(), self.cleaner.signature())
+                with TokenCache(self.cache_path, signature, self.cache_max_bytes) as cache:
+                    merge(self.iter_counts(texts, cache))
+                    print("cache hits: %d, misses: %d" % (cache.hits, cache.misses))
+                    metrics.count("cache_hits_total", cache.hits, project=data_dir.name)
+                    metrics.count("cache_misses_total", cache.misses, project=data_dir.name)
+            else:
+                merge(self.iter_counts(texts))
+        finally:
+            if wordsfile is not None:
+                wordsfile.close()
+                print("write words: %s" % wordsfile.name)
+
+        # Keep the counts by month to draw any window without parsing again
+        if by_month:
+            if topk:
+                buckets = {month: sketch.counts() for month, sketch in buckets.items()}
+            with WordIndex(data_dir.joinpath("words.db")) as index:
+                index.write(buckets)
+
+        metrics.count("tokens_total", total, project=data_dir.name)
+        if total == 0:
             print("Skip empty data")
+            # The words of the last parse should not be drawn again
+            for filename in ["words.json", "words_bounds.json"]:
+                Path(data_dir).joinpath(filename).unlink(missing_ok=True)
             return
+        print("total words: %d, total unique words: %d" % (total, len(wlist)))
+
+        if topk:
+            # Keep the error bounds of the counts
+            boundsfile = Path(data_dir).joinpath("words_bounds.json")
+            print("Write words: %s" % boundsfile)
+            with open(boundsfile, "w", encoding='utf-8') as f:
+                f.write(json.dumps({
+                    "capacity": wlist.capacity,
+                    "total": wlist.total,
+                    "max_error": wlist.max_error(),
+                    "words": wlist.most_common(),
+                }, indent=2, ensure_ascii=False))
+            metrics.maximum("count_error_max", wlist.max_error(), project=data_dir.name)
+            wlist = wlist.counts()
+
+        # Remove the stop words and numbers not to show on image.
+        self.remove_stop_words(wlist)
 
-        # Filter to replace all numeric chars to '0'.
-        class NumericReplaceFilter(TokenFilter):
-            def apply(self, tokens):
-                for token in tokens:
-                    parts = token.part_of_speech.split(',')
-                    if (parts[0] == '名詞' and parts[1] == '数'):
-                        token.surface = '0'
-                        token.base_form = '0'
-                        token.reading = 'ゼロ'
-                        token.phonetic = 'ゼロ'
-                    yield token
-
-        # Filter to remove single character.
-        class OneCharacterReplaceFilter(TokenFilter):
-            def apply(self, tokens):
-                for token in tokens:
-                    if re.match('^[あ-んア-ンa-zA-Z0-9ー]$', token.surface):
-                        continue
-                    yield token
+        jsonfile = Path(data_dir).joinpath("words.json")
+        print("Write words: %s" % jsonfile)
+        with open(jsonfile, "w", encoding='utf-8') as f:
+            f.write(json.dumps(wlist.most_common(), indent=2, ensure_ascii=False))
 
+        return wlist
 
-        # Create the Tokenizer.
-        tokenizer = Tokenizer()
+    def remove_stop_words(self, wlist):
+        """
+        Remove the stop words and numbers not to show on image.
 
-        # Charater filter for Janome.
-        char_filters = [ UnicodeNormalizeCharFilter() ]
+        Parameters
+        ----------
+        wlist : Counter
+            Number of occurrences of each word. The words are removed in place.
+        """
+        for word in [word for word in wlist if (word.lower() in self.stop_words) or word.isdigit()]:
+            del wlist[word]
+        return wlist
 
-        # Set up the filters
-        token_filters = [
-                        # NumericReplaceFilter(),
-                        CompoundNounFilter(),
-                        POSKeepFilter(['名詞', '動詞', '形容詞', '副詞']),
-                        # OneCharacterReplaceFilter()
-                        ]
+    def read_window(self, data_dir):
+        """
+        Sum the word counts of the window from the month index.
 
-        analyzer = Analyzer(char_filters=char_filters, tokenizer=tokenizer, token_filters=token_filters)
+        Parameters
+        ----------
+        data_dir : Path
+            Directory which have issue data
 
-        token_list = []
-        for line in text.splitlines():
-            line = self.cleanup_text( line )
-            # Parse the sentence and get the words.
-            ss = [token.base_form for token in analyzer.analyze(line)]
-            if len(ss) > 0:
-                token_list.append(ss)
+        Returns
+        ----------
+        (wlist, name) : tuple of Counter and String
+            Number of occurrences of each word, and the name of the image,
+            or None if the index is not made yet
+        """
+        indexfile = Path(data_dir).joinpath("words.db")
+        if not indexfile.exists():
+            return None, None
+        with WordIndex(indexfile) as index:
+            months = index.months()
+            start, end = parse_window(self.window, months[-1] if months else None)
+            print("Read words: %s (%s - %s)" % (indexfile, start, end))
+            wlist = index.counts(start, end)
+        return self.remove_stop_words(wlist), "%s_%s_%s" % (data_dir.name, start, end)
+
+    def report_window(self, data_dirs, top=20):
+        """
+        Report the top words of the window in each project and in all projects,
+        and the words rising and falling from the previous window of the same length.
 
-        # Create the word list
-        words = []
-        for line in token_list:
-            words.extend([word+' ' for word in line if word != ''])
+        Parameters
+        ----------
+        data_dirs : iterable of Path
+            Directories which have the month index
+        top : int
+            Number of words to report
 
-        # Export the words file (for debug)
-        wordsfile = data_dir.joinpath("words.txt")
-        print("total words: %d, write words: %s" % (len(words), wordsfile))
-        with open(wordsfile, 'w', encoding='utf-8') as f:
-            f.writelines(words)
+        Returns
+        ----------
+        report : dict
+            Top words and trend of the window
+        """
+        from src.wordindex import previous_window, trend
+
+        indexes = {}
+        latest = None
+        for data_dir in data_dirs:
+            indexfile = Path(data_dir).joinpath("words.db")
+            if indexfile.exists():
+                indexes[Path(data_dir).name] = WordIndex(indexfile)
+                months = indexes[Path(data_dir).name].months()
+                if months and (latest is None or months[-1] > latest):
+                    latest = months[-1]
+        try:
+            # The relative window ends at the latest month of all projects
+            start, end = parse_window(self.window, latest)
+            prev_start, prev_end = previous_window(start, end)
+            current = Counter()
+            previous = Counter()
+            projects = {}
+            for name, index in sorted(indexes.items()):
+                wlist = self.remove_stop_words(index.counts(start, end))
+                current.update(wlist)
+                previous.update(self.remove_stop_words(index.counts(prev_start, prev_end)))
+                projects[name] = {"total": sum(wlist.values()), "top": wlist.most_common(top)}
+        finally:
+            for index in indexes.values():
+                index.close()
+        rising, falling = trend(current, previous, top)
+        return {
+            "window": [start, end],
+            "previous": [prev_start, prev_end],
+            "total": sum(current.values()),
+            "top": current.most_common(top),
+            "rising": rising,
+            "falling": falling,
+            "projects": projects,
+        }
+
+    def read_words(self, data_dir):
+        """
+        Read the words counted by parse_text_data()
 
-        wlist = defaultdict(lambda: 0)
-        for word in words:
-            wlist[word] += 1
-        print("total unique words: %d" % (len(wlist.keys())))
+        Parameters
+        ----------
+        data_dir : Path
+            Directory which have issue data
 
-        wlist = sorted(wlist.items(), key=lambda x:x[1], reverse = True)
+        Returns
+        ----------
+        wlist : Counter
+            Number of occurrences of each word, or None if not counted yet
+        """
         jsonfile = Path(data_dir).joinpath("words.json")
-        print("Write words: %s" % jsonfile)
-        with open(jsonfile, "w", encoding='utf-8') as f:
-            f.write(json.dumps(list(wlist), indent=2, ensure_ascii=False))
+        if not jsonfile.exists():
+            return None
+        print("Read words: %s" % jsonfile)
+        with open(jsonfile, "r", encoding='utf-8') as f:
+            return Counter(dict(json.load(f)))
 
-        return words
-
-    def draw_words_cloud(self, data_dir, text):
+    def draw_words_cloud(self, data_dir, wlist=None, name=None):
         """
         Draw WordCloud figure for one project
 
@@ -169,15 +638,20 @@ class ImageCreator:
         ----------
         data_dir : Path
             Directory which have issue data
-        text : String
-            Text data to draw
+        wlist : Counter
+            Number of occurrences of each word. Read from words.json if not given.
+        name : String
+            Name of the image file. The project identifier if not given.
         """
         assert data_dir.exists() and data_dir.is_dir(), "Data folder should exist."
 
-        if (not text) or (len(text) == 0):
+        if wlist is None:
+            wlist = self.read_words(data_dir)
+        if not wlist:
             print("Skip empty text")
             return
-        text = ' '.join(text).replace('\n', '')
+        # Only the top words can be shown on image
+        frequencies = dict(wlist.most_common(self.max_words))
 
         # Japanese font
         fpath = '$HOME/Library/Fonts/ipagp.ttf'
@@ -185,35 +659,85 @@ class ImageCreator:
             fpath = r'C:\Windows\Fonts\YuGothB.ttc'
         elif os.name == 'posix':
             fpath = "/System/Library/Fonts/ヒラギノ丸ゴ ProN W4.ttc"
+        if self.font_path:
+            fpath = self.font_path
         print("use japanese font: %s" % fpath)
         assert Path(fpath).exists(), ("Japanese font should exist. %s" % fpath)
 
-        # Read the stop words not to show on image.
-        stop_words = []
-        stop_word_file = Path("config/stopwords.txt")
-        if stop_word_file.exists():
-            with open(stop_word_file, 'r', encoding='utf-8') as file:
-                ss = file.read()
-                stop_words = ss.split('\n')
-
-        # Image file path
-        image_dir = Path('image')
-        image_dir.mkdir(exist_ok=True)
-        imagefile = image_dir.joinpath(data_dir.name + ".png")
-        imagefile.unlink(missing_ok=True)
-
-        # Create the WordCloud image.
+        # Image files. The other sizes have the width in the name. (e.g. image/foo_300.png)
+        name = name or data_dir.name
+        image_dir = self.image_dir
+        image_dir.mkdir(parents=True, exist_ok=True)
+        imagefiles = {self.width: image_dir.joinpath(name + ".png")}
+        for width in self.sizes:
+            imagefiles.setdefault(width, image_dir.joinpath("%s_%d.png" % (name, width)))
+
+        # Skip if the same words are drawn with the same settings
+        key = self.render_key(frequencies, fpath)
+        keyfile = Path(self.render_cache_path).joinpath(name + ".key") if self.render_cache_path else None
+        if keyfile is not None and keyfile.exists() and all(f.exists() for f in imagefiles.values()):
+            if keyfile.read_text(encoding="utf-8") == key:
+                print("Skip unchanged image: %s" % imagefiles[self.width])
+                metrics.count("images_skipped_total", project=name)
+                return
+        for imagefile in imagefiles.values():
+            imagefile.unlink(missing_ok=True)
+
+        # Create the WordCloud layout once.
+        from PIL import Image
+        from wordcloud import WordCloud
         wordcloud = WordCloud(
                             background_color = "white",
                             font_path = fpath,
-                            collocations = False,
-                            width = 1200,
-                            height = 800,
-                            stopwords=set(stop_words))
-        wordcloud.generate(text)
-        wordcloud.to_file(imagefile)
-        print("draw image: %s" % imagefile)
-        assert imagefile.exists(), ("Image file should exist. %s" % imagefile)
+                            width = self.width,
+                            height = self.height,
+                            max_words = self.max_words)
+        wordcloud.generate_from_frequencies(frequencies)
+        image = wordcloud.to_image()
+        for width, imagefile in imagefiles.items():
+            if width == self.width:
+                image.save(imagefile)
+            elif width < self.width:
+                # Small fonts disappear if rendered in the small scale
+                image.resize((width, round(self.height * width / self.width)), resample=Image.LANCZOS).save(imagefile)
+            else:
+                # Render the same layout in the large scale
+                wordcloud.scale = width / self.width
+                wordcloud.to_image().save(imagefile)
+            print("draw image: %s" % imagefile)
+            assert imagefile.exists(), ("Image file should exist. %s" % imagefile)
+        metrics.count("images_drawn_total", project=name)
+
+        if keyfile is not None:
+            keyfile.parent.mkdir(parents=True, exist_ok=True)
+            keyfile.write_text(key, encoding="utf-8")
+
+    def render_key(self, frequencies, font_path):
+        """
+        Hash the words and the settings to draw.
+
+        Parameters
+        ----------
+        frequencies : dict
+            Number of occurrences of the words to draw
+        font_path : String
+            Font to draw
+
+        Returns
+        ----------
+        key : String
+            Hash of the image
+        """
+        from wordcloud import __version__
+        settings = {
+            "words": sorted(frequencies.items(), key=lambda item: (-item[1], item[0])),
+            "font": str(font_path),
+            "size": [self.width, self.height],
+            "sizes": sorted(set(self.sizes)),
+            "max_words": self.max_words,
+            "wordcloud": __version__,
+        }
+        return hashlib.sha1(json.dumps(settings, ensure_ascii=False).encode("utf-8")).hexdigest()
 
     def parse_and_draw_for_project(self, data_dir):
         """
@@ -226,23 +750,115 @@ class ImageCreator:
         """
         assert data_dir.exists() and data_dir.is_dir(), "Data folder should exist."
 
-        # Extract text from Redmine issues
-        text = self.extract_text(data_dir)
-        # Parse input text
-        words = self.parse_text_data(data_dir, text)
+        # Extract text from Redmine issues and parse it
+        wlist = None
+        if "parse" in self.stages:
+            with metrics.timer("parse_seconds", data_dir.name):
+                texts = self.extract_text(data_dir, by_month=True)
+                wlist = self.parse_text_data(data_dir, texts)
         # Draw picture by words
-        self.draw_words_cloud(data_dir, words)
+        if "draw" in self.stages:
+            with metrics.timer("draw_seconds", data_dir.name):
+                name = None
+                if self.window:
+                    wlist, name = self.read_window(data_dir)
+                if self.window and name is None:
+                    print("Skip the project without the month index: %s" % data_dir.name)
+                elif "parse" in self.stages and wlist is None:
+                    print("Skip empty text")
+                else:
+                    self.draw_words_cloud(data_dir, wlist, name)
+
+    def try_parse_and_draw_for_project(self, data_dir):
+        """
+        Parse text and draw WordCloud figure for one project, and report the result.
 
-    def parse_and_draw(self):
+        Parameters
+        ----------
+        data_dir : Path
+            Directory which have issue data
+
+        Returns
+        ----------
+        error : String
+            Error message, or None if succeeded
+        """
+        try:
+            self.parse_and_draw_for_project(data_dir)
+            return None
+        except Exception:
+            traceback.print_exc()
+            return traceback.format_exc(limit=1).strip().splitlines()[-1]
+
+    def parse_and_draw(self, projects=None):
         """
         Parse text and draw WordCloud figure for all input
+
+        Parameters
+        ----------
+        projects : list of String
+            Identifiers of the projects to draw. All projects if not given.
+
+        Returns
+        ----------
+        results : dict
+            Error message of each project, or None if succeeded
         """
         # Input folder
-        data_dir = Path('data')
-        # Search data files in the source folder
-        for datafile in sorted(data_dir.glob('**/issues.pickle')):
-            print("Read issue file: %s" % datafile)
-            self.parse_and_draw_for_project(datafile.parent)
+        data_dir = self.data_dir
+        # Search data files in the source folder.
+        # Larger projects first not to be left at the end.
+        datafiles = sorted(data_dir.glob('**/issues.db'))
+        if projects:
+            datafiles = [datafile for datafile in datafiles if datafile.parent.name in projects]
+        datafiles.sort(key=lambda datafile: datafile.stat().st_size, reverse=True)
+
+        return self.parse_and_draw_projects(datafile.parent for datafile in datafiles)
+
+    def parse_and_draw_projects(self, data_dirs):
+        """
+        Parse text and draw WordCloud figure for the projects
+
+        Parameters
+        ----------
+        data_dirs : iterable of Path
+            Directories which have issue data. It is consumed as the workers become free.
+
+        Returns
+        ----------
+        results : dict
+            Error message of each project, or None if succeeded
+        """
+        results = {}
+        if self.draw_workers > 1:
+            with ProcessPoolExecutor(max_workers=self.draw_workers, mp_context=_mp_context()) as executor:
+                futures = {}
+                for data_dir in data_dirs:
+                    # Wait for a free worker not to take the next project too early
+                    running = [future for future in futures.values() if not future.done()]
+                    if len(running) >= self.draw_workers:
+                        wait(running, return_when=FIRST_COMPLETED)
+                    print("Read issue file: %s" % data_dir.joinpath("issues.db"))
+                    futures[data_dir.name] = executor.submit(_parse_and_draw_project, self, data_dir, metrics.enabled)
+                for name, future in futures.items():
+                    try:
+                        results[name], snapshot = future.result()
+                        metrics.merge(snapshot)
+                    except Exception as ex:
+                        # The worker process may be terminated
+                        results[name] = repr(ex)
+        else:
+            for data_dir in data_dirs:
+                print("Read issue file: %s" % data_dir.joinpath("issues.db"))
+                results[data_dir.name] = self.try_parse_and_draw_for_project(data_dir)
+
+        # Report the results
+        failed = {name: error for name, error in results.items() if error is not None}
+        metrics.count("projects_failed_total", len(failed))
+        print("projects: %d, succeeded: %d, failed: %d" % (len(results), len(results) - len(failed), len(failed)))
+        for name, error in sorted(failed.items()):
+            print("failed project: %s (%s)" % (name, error))
+        return results
 
 if __name__ == "__main__":
     ic = ImageCreator()
@@ -1,41 +1,138 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
-import time
 import json
+import time
+import random
 import pickle
+import requests
 from pathlib import Path
 from dotenv import load_dotenv
 from redminelib import Redmine, exceptions
-from src.utils import setup_folder
+from src.utils import setup_folder, read_config, format_time, peak_memory, RateLimiter
+from src.store import IssueStore, issue_to_record
+from src.metrics import metrics
+from src.journal import CrawlJournal, RunJournal
+from src.segment import IssueSegment
+from src.httpcache import ResponseCache, CachingAdapter
+import heapq
 import logging
-from functools import wraps
-
-def my_log(logger):
-    # decorator for logger
-    def decorator_fn(fn):
-        @wraps(fn)
-        def wrap_fn(*args, **kwargs):
-            local_args = locals()
-            logger.debug(f"{fn.__name__} is called: {str(local_args)}")
-            return_val = fn(*args, **kwargs)
-            logger.debug(f"{fn.__name__} is complete: {str(return_val)}")
-            return return_val
-        return wrap_fn
-    return decorator_fn
+from contextlib import nullcontext
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+def is_transient_error(ex):
+    """
+    Check whether the error of Redmine API may be recovered by retrying.
+
+    Parameters
+    ----------
+    ex : Exception
+        Error of the request
+
+    Returns
+    ----------
+    transient : bool
+        True if the request should be retried
+    """
+    if isinstance(ex, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                       requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(ex, (exceptions.ServerError, exceptions.JSONDecodeError)):
+        return True
+    if isinstance(ex, exceptions.UnknownError):
+        status_code = getattr(ex, "status_code", 0)
+        return (status_code == 429) or (status_code >= 500)
+    return False
+
+def join_values(value):
+    """
+    Format the value of the filter in Redmine API. (e.g. [1, 2] -> "1|2")
+
+    Parameters
+    ----------
+    value : String, int or list
+        Value or list of values
+
+    Returns
+    ----------
+    text : String
+        Values joined by "|"
+    """
+    if isinstance(value, (list, tuple)):
+        return "|".join(str(v) for v in value)
+    return str(value)
+
+def date_range(value):
+    """
+    Format the date range of the filter in Redmine API.
+
+    Parameters
+    ----------
+    value : list of String
+        First and last date (YYYY-MM-DD). Either may be null.
+
+    Returns
+    ----------
+    text : String
+        Date range filter, or None if no date is given
+    """
+    start, end = (list(value) + [None, None])[:2]
+    if start and end:
+        return "><%s|%s" % (start, end)
+    if start:
+        return ">=%s" % start
+    if end:
+        return "<=%s" % end
+    return None
+
+class ResponseRecorder:
+    """
+    Hook of the requests session to record the responses of Redmine in the metrics.
+    """
+    def __init__(self):
+        # Project being fetched
+        self.project = ""
+
+    def __call__(self, response, *args, **kwargs):
+        if not metrics.enabled:
+            return
+        metrics.count("http_requests_total", project=self.project)
+        if getattr(response, "from_cache", False):
+            # Not modified. The body is read from the cache.
+            metrics.count("http_not_modified_total", project=self.project)
+            size = 0
+        else:
+            # Body size on the wire (compressed size if compressed)
+            size = int(response.headers.get("Content-Length") or len(response.content))
+        metrics.count("http_bytes_total", size, project=self.project)
+        metrics.observe("http_request_seconds", response.elapsed.total_seconds(), project=self.project)
+        if response.status_code >= 400:
+            metrics.count("http_errors_total", project=self.project)
 
 class IssueExtractor:
     __redmine = None
+    # Maximum page size of Redmine REST API
+    PAGE_SIZE = 100
+
+    def __init__(self, data_dir="data", config=None):
+        # Output directory
+        self.data_dir = Path(data_dir)
+        # Config values. Read from config/projects.json if not given.
+        self.config = read_config() if config is None else config
+        # Metrics of the responses of the project being fetched
+        self.recorder = ResponseRecorder()
 
-    def __init__(self):
         # logger
         self.__logger = logging.getLogger(__file__)
         self.__logger.setLevel(logging.DEBUG)
-        handler = logging.StreamHandler()
-        handler.setLevel(logging.DEBUG)
-        fmt = logging.Formatter("[%(asctime)s] %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s")
-        handler.setFormatter(fmt)
-        self.__logger.addHandler(handler)
+        # The logger is shared by the extractors. (e.g. each refresh of watch)
+        if not self.__logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setLevel(logging.DEBUG)
+            fmt = logging.Formatter("[%(asctime)s] %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s")
+            handler.setFormatter(fmt)
+            self.__logger.addHandler(handler)
 
         # config
         self.load_config()
@@ -49,24 +146,125 @@ class IssueExtractor:
         API_KEY = os.environ.get("REDMINE_API_KEY")
         assert API_KEY is not None, "Redmine api key should be configured."
 
-        redmine_url = "http://localhost/redmine/"
-        config_file = Path('config/projects.json')
-        if config_file.exists():
-            self.__logger.debug("Read the config file: %s" % config_file)
-            with open(config_file, 'r', encoding='utf-8') as f:
-                df = json.load(f)
-            # Read Redmine url
-            redmine_url = df.get("redmine.url", redmine_url)
+        df = self.config
+        # Read Redmine url
+        redmine_url = df.get("redmine.url", "http://localhost/redmine/")
+
+        # Number of concurrent requests and requests per second
+        self.workers = max(1, int(df.get("fetch.workers", 4)))
+        self.__limiter = RateLimiter(df.get("fetch.rate", 10), df.get("fetch.burst", self.workers))
+        self.__logger.debug("workers: %d, rate: %s" % (self.workers, self.__limiter.rate))
+
+        # Retry of the transient errors. The wait is doubled for each retry.
+        self.retries = int(df.get("fetch.retries", 5))
+        self.backoff = float(df.get("fetch.backoff", 1.0))
+        self.backoff_max = float(df.get("fetch.backoff_max", 60.0))
+        # Number of issues written to the store at once
+        self.flush_size = max(1, int(df.get("fetch.flush", self.PAGE_SIZE)))
+        # Format of the issue data: "json" (file of each issue) or "segment" (one file of each project)
+        self.output = df.get("fetch.output", "json")
+        assert self.output in ("json", "segment"), "fetch.output should be json or segment."
+
+        # Projects to fetch. All projects if not given.
+        self.identifiers = list(df.get("identifier", []))
+        # Keywords of the issue subject of each project
+        self.keywords = {}
+        for identifier, keyword in df.get("issue.filter", []):
+            self.keywords.setdefault(identifier, []).append(keyword)
+        # Filters of the issue list passed to Redmine API
+        self.issue_query = {"status_id": join_values(df.get("issue.status", "*"))}
+        if df.get("issue.tracker"):
+            self.issue_query["tracker_id"] = join_values(df.get("issue.tracker"))
+        created_on = date_range(df.get("issue.created_on", []))
+        if created_on:
+            self.issue_query["created_on"] = created_on
+        self.__logger.debug("projects: %s, query: %s" % (self.identifiers, self.issue_query))
 
-        # create Redmine instance to call API
+        # Cache of the responses revalidated by ETag and Last-Modified. Disabled if the path is empty.
+        cache_path = df.get("cache.http", "cache/http.db")
+        self.http_cache = ResponseCache(cache_path, int(df.get("cache.http.max_bytes", 256 * 1024 * 1024))) \
+            if cache_path else None
+        # Connections kept for the workers
+        self.pool_size = max(1, int(df.get("fetch.pool", max(10, self.workers))))
+
+        # create Redmine instance to call API. The responses are compressed by gzip.
         self.__logger.debug("url: %s" % redmine_url)
-        self.__redmine = Redmine(redmine_url, key=API_KEY)
+        self.__redmine = Redmine(redmine_url, key=API_KEY,
+                                 requests={"headers": {"Accept-Encoding": "gzip, deflate"}})
         assert self.__redmine is not None, "Redmine instance should be created."
 
-    def fetch_projects(self):
+        self.__adapter = None
+        session = getattr(getattr(self.__redmine, "engine", None), "session", None)
+        if session is not None:
+            self.__adapter = CachingAdapter(self.http_cache, pool_maxsize=self.pool_size)
+            session.mount("http://", self.__adapter)
+            session.mount("https://", self.__adapter)
+            # Record the responses in the metrics
+            session.hooks["response"].append(self.recorder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the cache of the responses. The old responses are evicted.
+        The requests after closing are sent without the cache.
+        """
+        if self.http_cache is None:
+            return
+        if self.__adapter is not None:
+            self.__adapter.cache = None
+        self.http_cache.close()
+        self.http_cache = None
+
+    def request(self, fn, *args, **kwargs):
+        """
+        Call Redmine API with the rate limit.
+        Transient errors are retried with exponential backoff and jitter.
+
+        Parameters
+        ----------
+        fn : function
+            Function to call Redmine API
+        args, kwargs
+            Arguments of the function
+
+        Returns
+        ----------
+        result : any
+            Result of the function
+        """
+        attempt = 0
+        while True:
+            self.__limiter.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as ex:
+                if (attempt >= self.retries) or (not is_transient_error(ex)):
+                    raise
+                # Wait half of the backoff at least, and random time up to the backoff
+                backoff = min(self.backoff_max, self.backoff * (2 ** attempt))
+                delay = backoff / 2 + random.uniform(0, backoff / 2)
+                attempt += 1
+                self.__logger.warning("Retry %d/%d in %.1f sec: %s" % (attempt, self.retries, delay, repr(ex)))
+                metrics.count("http_retries_total", project=self.recorder.project)
+                time.sleep(delay)
+
+    def fetch_projects(self, identifiers=None, save=True):
         """
         Fetch the list of projects from Redmine.
 
+        Parameters
+        ----------
+        identifiers : list of String
+            Identifiers of the projects to fetch.
+            The projects in the config are fetched if not given, or all projects if not configured.
+        save : bool
+            Write the projects to data/<PROJECT_ID>/project.json
+
         Returns
         ----------
         projects : List of projects
@@ -74,23 +272,30 @@ class IssueExtractor:
         """
         assert self.__redmine is not None, "Redmine instance should be created."
 
-        # Output directory
-        data_dir = Path("data")
-
+        self.recorder.project = ""
         projects = []
         offset = 0
-        step = 50
-        while True:
+        step = self.PAGE_SIZE
+        identifiers = identifiers or self.identifiers
+        for identifier in identifiers:
+            # Fetch only the selected projects
+            try:
+                self.__logger.debug("Fetching project: %s" % (identifier))
+                projects.append(self.request(self.__redmine.project.get, identifier))
+            except exceptions.ResourceNotFoundError:
+                self.__logger.warning("Project not found: %s" % identifier)
+        while not identifiers:
             try:
                 self.__logger.debug("Fetching projects, offset: %d" % (offset))
-                pjs = self.__redmine.project.all(offset=offset, limit=step)
+                pjs = self.request(lambda: list(self.__redmine.project.all(offset=offset, limit=step)))
                 # print("List all projects: %s" % projects)
                 if len(pjs) == 0:
                     break
                 projects.extend(pjs)
                 offset += len(pjs)
-                # Relax as Redmine server need short break;-p
-                time.sleep(0.1)
+                # The last page is shorter than the page size
+                if len(pjs) < step:
+                    break
             except exceptions.ResourceNotFoundError as ex:
                 # An exception may be thrown if an communication error occurs.
                 print(type(ex))
@@ -99,8 +304,10 @@ class IssueExtractor:
 
         for project in projects:
             self.__logger.debug("Project identifier: %s" % (project.identifier))
+            if not save:
+                continue
             # Dump data
-            project_dir = data_dir.joinpath(project.identifier)
+            project_dir = self.data_dir.joinpath(project.identifier)
             project_dir.mkdir(parents=True, exist_ok=True)
 
             project_file = project_dir.joinpath("project.pickle")
@@ -112,8 +319,34 @@ class IssueExtractor:
                 f.write(json.dumps(list(project), indent=2, ensure_ascii=False))
         return projects
 
-    @my_log(logging.getLogger(__file__))
-    def fetch_issue_list(self, project):
+    def count_issues(self, project):
+        """
+        Count the issues of Redmine project matching the issue filters.
+
+        Parameters
+        ----------
+        project : Project
+            Redmine resource to count
+
+        Returns
+        ----------
+        count : int
+            Number of the issues
+        """
+        assert self.__redmine is not None, "Redmine instance should be created."
+        self.recorder.project = project.identifier
+
+        query = dict(project_id=project.id, subproject_id="!*")
+        query.update(self.issue_query)
+
+        def count():
+            # Only the total count is used
+            issues = self.__redmine.issue.filter(offset=0, limit=1, **query)
+            list(issues)
+            return issues.total_count
+        return self.request(count)
+
+    def fetch_issue_list(self, project, updated_since=None):
         """
         Fetch the list of issue ID from Redmine project.
 
@@ -121,6 +354,8 @@ class IssueExtractor:
         ----------
         project : Project
             Redmine resource to fetch
+        updated_since : String
+            Fetch only the issues updated on or after this time (ISO 8601)
 
         Returns
         ----------
@@ -130,27 +365,84 @@ class IssueExtractor:
         assert self.__redmine is not None, "Redmine instance should be created."
         self.__logger.debug("Fetch issue list for project: %s" % (project.identifier))
 
-        ids = []
+        return [issue.id for issue in self.iter_issue_list(project, updated_since)]
+
+    def iter_issue_list(self, project, updated_since=None, after_id=0):
+        """
+        Iterate the issues of Redmine project page by page.
+
+        Parameters
+        ----------
+        project : Project
+            Redmine resource to fetch
+        updated_since : String
+            Fetch only the issues updated on or after this time (ISO 8601)
+        after_id : int
+            Fetch only the issues whose id is larger than this id
+
+        Yields
+        ----------
+        issue : Redmine issue data
+            Redmine issue resource without journals and changesets
+        """
+        assert self.__redmine is not None, "Redmine instance should be created."
+
+        # Query parameters for the issue list
+        query = dict(project_id=project.id, subproject_id="!*", sort='id:asc')
+        query.update(self.issue_query)
+        if updated_since:
+            query["updated_on"] = ">=%s" % updated_since
+        if after_id:
+            query["issue_id"] = ">=%d" % (after_id + 1)
+
+        keywords = self.keywords.get(project.identifier)
+        if not keywords:
+            yield from self.iter_issue_query(query, after_id)
+            return
+        # Issues matching any keyword. Each list is sorted by id, so they are merged in the order of id.
+        queries = [dict(query, subject="~%s" % keyword) for keyword in keywords]
+        last_id = None
+        for issue in heapq.merge(*[self.iter_issue_query(q, after_id) for q in queries], key=lambda i: i.id):
+            if issue.id != last_id:
+                yield issue
+            last_id = issue.id
+
+    def iter_issue_query(self, query, after_id=0):
+        """
+        Iterate the issues matching the query page by page.
+
+        Parameters
+        ----------
+        query : dict
+            Query parameters of the issue list
+        after_id : int
+            Skip the issues whose id is not larger than this id
+
+        Yields
+        ----------
+        issue : Redmine issue data
+            Redmine issue resource without journals and changesets
+        """
         offset = 0
-        step = 50
+        step = self.PAGE_SIZE
         while True:
             try:
-                # Fetch id list from Redmine
+                # Fetch the page from Redmine
                 self.__logger.debug("Fetch issue list by offset: %d" % (offset))
-                issues = self.__redmine.issue.filter(project_id=project.id, subproject_id="!*", offset=offset, limit=step, status_id="*", sort='id:asc')
+                issues = self.request(lambda: list(self.__redmine.issue.filter(offset=offset, limit=step, **query)))
                 if len(issues) == 0:
                     break
-                for issue in issues:
-                    ids.append(issue.id)
+                # The issue id filter may not be supported by the server
+                yield from (issue for issue in issues if not after_id or issue.id > after_id)
                 offset += len(issues)
-                # Relax as Redmine server need short break;-p
-                time.sleep(0.1)
+                # The last page is shorter than the page size
+                if len(issues) < step:
+                    break
             except exceptions.ResourceNotFoundError as ex:
                 # An exception may be thrown if an communication error occurs.
                 print(type(ex))
                 print(ex)
                 break
-        return ids
 
     def fetch_issue_detail(self, issue_id):
         """
@@ -170,13 +462,76 @@ class IssueExtractor:
         assert type(issue_id) == int, "Issue id should be int."
 
         # Fetch issue detail
-        issue = self.__redmine.issue.get(issue_id, include=['changesets', 'journals'])
+        issue = self.request(self.__redmine.issue.get, issue_id, include=['changesets', 'journals'])
         # print("%d:%s (%s)" % (issue.id, issue.subject, issue.created_on))
         # print("id: %d, " % (issue.id), end="")
         # self.__logger.debug("%d:%s (%s)" % (issue.id, issue.subject, issue.created_on))
         return issue
 
-    def fetch_issues_for_project(self, project):
+    def load_checkpoint(self, project_dir):
+        """
+        Load the checkpoint manifest of the project.
+
+        Parameters
+        ----------
+        project_dir : Path
+            Directory which have issue data
+
+        Returns
+        ----------
+        checkpoint : dict
+            Checkpoint data. Empty if the project is not synced yet.
+        """
+        checkpoint_file = project_dir.joinpath("checkpoint.json")
+        if not checkpoint_file.exists():
+            return {}
+        with open(checkpoint_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_checkpoint(self, project_dir, checkpoint):
+        """
+        Save the checkpoint manifest of the project.
+
+        Parameters
+        ----------
+        project_dir : Path
+            Directory which have issue data
+        checkpoint : dict
+            Checkpoint data to save
+        """
+        checkpoint_file = project_dir.joinpath("checkpoint.json")
+        self.__logger.debug("Write checkpoint: %s" % checkpoint_file)
+        with open(checkpoint_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps(checkpoint, indent=2, ensure_ascii=False))
+
+    def fetch_issue_details(self, issue_ids):
+        """
+        Fetch the issue data from Redmine concurrently.
+
+        Parameters
+        ----------
+        issue_ids : iterable of int
+            Issue ids of Redmine. It is consumed while the details are fetched.
+
+        Yields
+        ----------
+        (issue_id, issue) : tuple of int and Redmine issue data
+            Redmine issue resources in the order of the issue ids
+        """
+        # Keep a bounded number of requests in flight
+        window = self.workers * 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for issue_id in issue_ids:
+                pending.append((issue_id, executor.submit(self.fetch_issue_detail, issue_id)))
+                if len(pending) >= window:
+                    issue_id, future = pending.popleft()
+                    yield issue_id, future.result()
+            while pending:
+                issue_id, future = pending.popleft()
+                yield issue_id, future.result()
+
+    def fetch_issues_for_project(self, project, incremental=False, resume=False):
         """
         Fetch the issue data from Redmine and export it
 
@@ -184,53 +539,166 @@ class IssueExtractor:
         ----------
         project : Project
             Redmine resource to fetch
+        incremental : bool
+            Fetch only the issues updated since the last checkpoint
+            and merge them into the existing data.
+        resume : bool
+            Continue from the last issue persisted by the interrupted run.
+
+        Returns
+        ----------
+        changed : int
+            Number of the issues updated after the last checkpoint
         """
         assert self.__redmine is not None, "Redmine instance should be created."
         assert project is not None, "Redmine project should be given."
+        self.recorder.project = project.identifier
 
         # Output directory
-        data_dir = Path("data").joinpath(project.identifier)
+        data_dir = self.data_dir.joinpath(project.identifier)
         issue_dir = data_dir.joinpath("issues")
-        issue_dir.mkdir(parents=True, exist_ok=True)
+        if self.output == "json":
+            issue_dir.mkdir(parents=True, exist_ok=True)
+        dumpfile = data_dir.joinpath("issues.db")
+        segmentfile = data_dir.joinpath("issues.seg")
+
+        # Read the last checkpoint
+        checkpoint = {}
+        if incremental and dumpfile.exists():
+            checkpoint = self.load_checkpoint(data_dir)
 
-        # Fetch ids of all issues for the project
-        issue_list = self.fetch_issue_list(project)
+        # Read the journal of the interrupted run
+        journal = CrawlJournal(data_dir.joinpath("crawl.journal"))
+        state = journal.load() if resume and dumpfile.exists() else None
+        if state is None:
+            if not checkpoint:
+                # Clean up the issue files of the project
+                if self.output == "segment":
+                    with IssueSegment(segmentfile) as segment:
+                        segment.clear()
+                else:
+                    setup_folder(issue_dir)
+                with IssueStore(dumpfile) as store:
+                    store.clear()
+            journal.start()
+            state = {"last_id": 0, "updated_on": checkpoint.get("updated_on"), "count": 0}
+        else:
+            self.__logger.info("Resume %s after issue %d" % (project.identifier, state["last_id"]))
+        updated_since = checkpoint.get("updated_on")
+        self.__logger.debug("Updated since: %s" % updated_since)
 
+        # Stream the issues to update from the issue list to the detail stage
         self.__logger.debug("Fetch issue detail...")
-        issues = []
-        i = 0
-        for issue_id in issue_list:
-            # Fetch the description and notes of the issue
-            issue = self.fetch_issue_detail(issue_id)
-            issues.append(issue)
-            # Export the issue
-            issuefile = issue_dir.joinpath(str(issue_id) + ".json")
-            with open(issuefile, "w", encoding="utf-8") as f:
-                f.write(json.dumps(list(issue), indent=2, ensure_ascii=False))
-            i += 1
-            if i%10 == 0:
-                self.__logger.debug("issues: %d" % i)
+        last_id = state["last_id"]
+        latest = state["updated_on"]
+        i = state["count"]
+        changed = 0
+        issue_list = (issue.id for issue in self.iter_issue_list(project, updated_since, after_id=last_id))
+        records = []
+        segment = IssueSegment(segmentfile) if self.output == "segment" else nullcontext()
+        with IssueStore(dumpfile) as store, segment:
+            for issue_id, issue in self.fetch_issue_details(issue_list):
+                # Keep the text and timestamp fields only
+                records.append(issue_to_record(issue))
+                # Export the issue
+                if self.output == "segment":
+                    segment.put(issue_id, list(issue))
+                else:
+                    issuefile = issue_dir.joinpath(str(issue_id) + ".json")
+                    with open(issuefile, "w", encoding="utf-8") as f:
+                        f.write(json.dumps(list(issue), indent=2, ensure_ascii=False))
+                # Keep the latest update time
+                updated_on = format_time(issue.updated_on)
+                if updated_on and (latest is None or updated_on > latest):
+                    latest = updated_on
+                # The issue at the checkpoint time is fetched again
+                if (updated_since is None) or (updated_on is None) or (updated_on > updated_since):
+                    changed += 1
+                last_id = issue_id
+                i += 1
+                if i%10 == 0:
+                    self.__logger.debug("issues: %d" % i)
+                # Persist the issues and record them in the journal.
+                # The updated issues are merged into the existing data.
+                if len(records) >= self.flush_size:
+                    if self.output == "segment":
+                        segment.flush()
+                    store.write_issues(records)
+                    journal.record(last_id, latest, i)
+                    records = []
+            store.write_issues(records)
+            total = store.count()
+            if self.output == "segment":
+                segment.flush()
+                # Drop the old versions of the updated issues
+                if segment.garbage() > len(segment):
+                    segment.compact()
         self.__logger.debug("...done")
+        self.__logger.debug("Write issues, updated: %d, total: %d" % (i, total))
+        metrics.count("issues_fetched_total", i - state["count"], project=project.identifier)
 
-        # Export issues data
-        dumpfile = data_dir.joinpath("issues.pickle")
-        self.__logger.debug("Write issues: %s" % dumpfile)
-        with open(dumpfile, "wb") as f:
-            pickle.dump(issues, f)
+        # Write the checkpoint after the data is saved
+        self.save_checkpoint(data_dir, {"updated_on": latest, "issues": total})
+        journal.finish()
+        return changed
 
-    def export_issues(self):
+    def export_issues(self, incremental=False, projects=None, resume=False):
         """
         Write all issue data to files
+
+        Parameters
+        ----------
+        incremental : bool
+            Keep the existing data and fetch only the updated issues.
+        projects : list of String
+            Identifiers of the projects to fetch. All projects if not given.
+        resume : bool
+            Continue the interrupted run.
+        """
+        for _ in self.iter_export_issues(incremental, projects, resume):
+            pass
+        # Peak of the process so far. It is not of each project, because it never decreases.
+        metrics.maximum("memory_peak_bytes", peak_memory())
+
+    def iter_export_issues(self, incremental=False, projects=None, resume=False):
         """
-        # Clean up the folder before run
-        data_dir = Path("data")
-        setup_folder(data_dir)
+        Write all issue data to files project by project
+
+        Parameters
+        ----------
+        incremental : bool
+            Keep the existing data and fetch only the updated issues.
+        projects : list of String
+            Identifiers of the projects to fetch. The projects in the config if not given.
+            The data of the other projects are kept.
+        resume : bool
+            Continue the interrupted run. The completed projects are not fetched again.
+
+        Yields
+        ----------
+        data_dir : Path
+            Directory which have issue data of the exported project
+        """
+        run_journal = RunJournal(self.data_dir.joinpath("crawl.json"))
+        completed = run_journal.load() if resume else []
+        if incremental or projects or resume:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            # Clean up the folder before run
+            setup_folder(self.data_dir)
+        if not resume:
+            run_journal.start()
 
         # Fetch all projcts
-        projects = self.fetch_projects()
-        for project in projects:
-            # Export issues for the project
-            self.fetch_issues_for_project(project)
+        for project in self.fetch_projects(projects):
+            if project.identifier in completed:
+                self.__logger.info("Skip %s completed in the last run" % project.identifier)
+            else:
+                # Export issues for the project
+                with metrics.timer("fetch_seconds", project.identifier):
+                    self.fetch_issues_for_project(project, incremental, resume)
+                run_journal.complete(project.identifier)
+            yield self.data_dir.joinpath(project.identifier)
 
 if __name__ == "__main__":
     ie = IssueExtractor()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+class ResponseCache:
+    """
+    Persistent cache of the response bodies with their validators. (ETag and Last-Modified)
+    It is shared by the threads of the extractor.
+
+    Parameters
+    ----------
+    path : Path
+        Database file of the cache
+    max_bytes : int
+        Maximum size of the cached bodies. Least recently used bodies are evicted.
+    """
+    # Number of the stored responses between the evictions
+    EVICT_INTERVAL = 100
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.__puts = 0
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.__conn.executescript(SCHEMA)
+
+    @staticmethod
+    def key(method, url):
+        """
+        Make the key of the request. The URL has the API key, so only the hash is stored.
+        """
+        return hashlib.sha256(("%s %s" % (method, url)).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Get the cached response.
+
+        Parameters
+        ----------
+        key : String
+            Key made by key()
+
+        Returns
+        ----------
+        (etag, last_modified, content_type, body) : tuple
+            Validators, content type and decoded body, or None if not cached
+        """
+        with self.__lock:
+            row = self.__conn.execute(
+                "SELECT etag, last_modified, content_type, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with self.__conn:
+                self.__conn.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+        etag, last_modified, content_type, body = row
+        return etag, last_modified, content_type, zlib.decompress(body)
+
+    def put(self, key, etag, last_modified, content_type, body):
+        """
+        Put the response to the cache.
+
+        Parameters
+        ----------
+        key : String
+            Key made by key()
+        etag : String
+            ETag header of the response
+        last_modified : String
+            Last-Modified header of the response
+        content_type : String
+            Content-Type header of the response
+        body : bytes
+            Decoded body of the response
+        """
+        data = zlib.compress(body)
+        with self.__lock:
+            with self.__conn:
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, etag, last_modified, content_type, data, len(data), time.time()))
+            self.__puts += 1
+            if self.__puts % self.EVICT_INTERVAL == 0:
+                self.evict()
+
+    def evict(self):
+        """
+        Evict the least recently used bodies until the cache fits in max_bytes.
+        """
+        size = self.__conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if size <= self.max_bytes:
+            return 0
+        keys = []
+        for key, n in self.__conn.execute("SELECT key, size FROM responses ORDER BY used"):
+            if size <= self.max_bytes:
+                break
+            keys.append((key,))
+            size -= n
+        with self.__conn:
+            self.__conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        return len(keys)
+
+    def close(self):
+        with self.__lock:
+            self.evict()
+            self.__conn.close()
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter of the requests session to revalidate the cached responses.
+    The GET request has If-None-Match and If-Modified-Since of the cached response,
+    and 304 Not Modified is answered with the cached body as 200.
+
+    Parameters
+    ----------
+    cache : ResponseCache
+        Cache of the responses. Requests are sent as is if not given.
+    pool_connections : int
+        Number of the connection pools (hosts)
+    pool_maxsize : int
+        Number of the connections kept in a pool
+    """
+    def __init__(self, cache=None, pool_connections=10, pool_maxsize=10):
+        self.cache = cache
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def send(self, request, **kwargs):
+        if self.cache is None or request.method != "GET":
+            return super().send(request, **kwargs)
+        key = self.cache.key(request.method, request.url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            etag, last_modified, _, _ = cached
+            if etag:
+                request.headers["If-None-Match"] = etag
+            if last_modified:
+                request.headers["If-Modified-Since"] = last_modified
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            # Body of the cached response. It is not counted in the downloaded bytes.
+            response.status_code = 200
+            response.reason = "OK"
+            response.from_cache = True
+            response.headers["Content-Type"] = cached[2] or "application/json"
+            response.encoding = get_encoding_from_headers(response.headers)
+            response._content = cached[3]
+        elif response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.cache.put(key, etag, last_modified, response.headers.get("Content-Type"), response.content)
+        return response
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+from pathlib import Path
+
+class CrawlJournal:
+    """
+    Append-only journal of the issues persisted while a project is fetched.
+    Issues are fetched in the order of id, so every issue up to the last id is persisted.
+
+    Parameters
+    ----------
+    path : Path
+        Journal file of the project
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        """
+        Read the last state of the journal.
+
+        Returns
+        ----------
+        state : dict
+            Last persisted issue id, latest update time and number of issues,
+            or None if the project is not in progress.
+        """
+        if not self.path.exists():
+            return None
+        state = {"last_id": 0, "updated_on": None, "count": 0}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    state.update(json.loads(line))
+                except ValueError:
+                    # The last line may be broken by the crash
+                    break
+        return state
+
+    def start(self):
+        """
+        Start the new journal.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"last_id": 0, "updated_on": None, "count": 0}) + "\n")
+
+    def record(self, last_id, updated_on, count):
+        """
+        Record the persisted issues.
+
+        Parameters
+        ----------
+        last_id : int
+            Last persisted issue id
+        updated_on : String
+            Latest update time of the persisted issues
+        count : int
+            Number of persisted issues
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"last_id": last_id, "updated_on": updated_on, "count": count}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def finish(self):
+        """
+        Delete the journal after the project is completed.
+        """
+        self.path.unlink(missing_ok=True)
+
+class RunJournal:
+    """
+    Journal of the projects completed in the run.
+
+    Parameters
+    ----------
+    path : Path
+        Journal file of the run
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.completed = []
+
+    def load(self):
+        """
+        Read the projects completed in the last run.
+
+        Returns
+        ----------
+        completed : list of String
+            Identifiers of the completed projects
+        """
+        self.completed = []
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.completed = json.load(f).get("completed", [])
+        return self.completed
+
+    def start(self):
+        """
+        Start the new run.
+        """
+        self.completed = []
+        self.save()
+
+    def complete(self, identifier):
+        """
+        Record the completed project.
+
+        Parameters
+        ----------
+        identifier : String
+            Identifier of the project
+        """
+        if identifier not in self.completed:
+            self.completed.append(identifier)
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmpfile = self.path.with_suffix(".tmp")
+        with open(tmpfile, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"completed": self.completed}, indent=2, ensure_ascii=False))
+        os.replace(tmpfile, self.path)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, float("inf"))
+
+class _NullTimer:
+    # Timer used while the metrics are disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    def __init__(self, metrics, name, project):
+        self.metrics = metrics
+        self.name = name
+        self.project = project
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, self.project)
+        return False
+
+class Metrics:
+    """
+    Counters and histograms of each project. Nothing is recorded while disabled.
+    Metrics without the project are recorded for the whole run.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.__lock = threading.Lock()
+        self.__counters = {}
+        self.__histograms = {}
+        # Names of the counters keeping the maximum value
+        self.__maxima = set()
+
+    def reset(self):
+        """
+        Delete all recorded values.
+        """
+        with self.__lock:
+            self.__counters = {}
+            self.__histograms = {}
+            self.__maxima = set()
+
+    def count(self, name, value=1, project=""):
+        """
+        Add the value to the counter.
+
+        Parameters
+        ----------
+        name : String
+            Name of the counter
+        value : int or float
+            Value to add
+        project : String
+            Project identifier
+        """
+        if not self.enabled:
+            return
+        key = (name, project)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def maximum(self, name, value, project=""):
+        """
+        Keep the maximum value in the counter. (e.g. high-water mark)
+
+        Parameters
+        ----------
+        name : String
+            Name of the counter
+        value : int or float
+            Value to compare
+        project : String
+            Project identifier
+        """
+        if not self.enabled:
+            return
+        key = (name, project)
+        with self.__lock:
+            self.__maxima.add(name)
+            self.__counters[key] = max(self.__counters.get(key, value), value)
+
+    def observe(self, name, value, project=""):
+        """
+        Record the value in the histogram.
+
+        Parameters
+        ----------
+        name : String
+            Name of the histogram
+        value : float
+            Value to record (seconds)
+        project : String
+            Project identifier
+        """
+        if not self.enabled:
+            return
+        key = (name, project)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = self.__histograms[key] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+            histogram["buckets"][bisect.bisect_left(BUCKETS, value)] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def timer(self, name, project=""):
+        """
+        Measure the time of the with block in the histogram.
+
+        Parameters
+        ----------
+        name : String
+            Name of the histogram
+        project : String
+            Project identifier
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, project)
+
+    def snapshot(self):
+        """
+        Copy the recorded values to merge them in another process.
+
+        Returns
+        ----------
+        snapshot : tuple of dict and set
+            Counters, histograms and names of the maximum counters
+        """
+        with self.__lock:
+            histograms = {key: dict(h, buckets=list(h["buckets"])) for key, h in self.__histograms.items()}
+            return dict(self.__counters), histograms, set(self.__maxima)
+
+    def merge(self, snapshot):
+        """
+        Merge the values recorded in another process.
+
+        Parameters
+        ----------
+        snapshot : tuple of dict
+            Values made by snapshot()
+        """
+        if not self.enabled or not snapshot:
+            return
+        counters, histograms, maxima = snapshot
+        with self.__lock:
+            self.__maxima.update(maxima)
+            for key, value in counters.items():
+                if key[0] in self.__maxima:
+                    self.__counters[key] = max(self.__counters.get(key, value), value)
+                else:
+                    self.__counters[key] = self.__counters.get(key, 0) + value
+            for key, other in histograms.items():
+                histogram = self.__histograms.get(key)
+                if histogram is None:
+                    self.__histograms[key] = dict(other, buckets=list(other["buckets"]))
+                    continue
+                histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], other["buckets"])]
+                histogram["count"] += other["count"]
+                histogram["sum"] += other["sum"]
+
+    def summary(self):
+        """
+        Summarize the values by project.
+
+        Returns
+        ----------
+        summary : dict
+            Counters and histograms of each project. The project "" is the whole run.
+        """
+        counters, histograms, _ = self.snapshot()
+        summary = {}
+        for (name, project), value in sorted(counters.items()):
+            summary.setdefault(project, {}).setdefault("counters", {})[name] = value
+        for (name, project), histogram in sorted(histograms.items()):
+            summary.setdefault(project, {}).setdefault("histograms", {})[name] = {
+                "count": histogram["count"],
+                "sum": histogram["sum"],
+                "buckets": {("+Inf" if le == float("inf") else str(le)): n
+                            for le, n in zip(BUCKETS, histogram["buckets"]) if n},
+            }
+        return summary
+
+    def to_json(self):
+        """
+        Format the summary in JSON.
+        """
+        return json.dumps(self.summary(), indent=2, ensure_ascii=False)
+
+    def to_prometheus(self, prefix="redtickets"):
+        """
+        Format the values in Prometheus text format.
+        """
+        counters, histograms, maxima = self.snapshot()
+
+        def escape(value):
+            # Backslash first, not to escape the escapes
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def labels(project, **extra):
+            items = ([("project", project)] if project else []) + list(extra.items())
+            if not items:
+                return ""
+            return "{%s}" % ",".join('%s="%s"' % (k, escape(v)) for k, v in items)
+
+        lines = []
+        for name in sorted(set(name for name, _ in counters)):
+            lines.append("# TYPE %s_%s %s" % (prefix, name, "gauge" if name in maxima else "counter"))
+            for (n, project), value in sorted(counters.items()):
+                if n == name:
+                    lines.append("%s_%s%s %s" % (prefix, name, labels(project), value))
+        for name in sorted(set(name for name, _ in histograms)):
+            lines.append("# TYPE %s_%s histogram" % (prefix, name))
+            for (n, project), histogram in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for le, count in zip(BUCKETS, histogram["buckets"]):
+                    cumulative += count
+                    le = "+Inf" if le == float("inf") else str(le)
+                    lines.append("%s_%s_bucket%s %d" % (prefix, name, labels(project, le=le), cumulative))
+                lines.append("%s_%s_sum%s %s" % (prefix, name, labels(project), histogram["sum"]))
+                lines.append("%s_%s_count%s %d" % (prefix, name, labels(project), histogram["count"]))
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir):
+        """
+        Write the summary to metrics.json and metrics.prom.
+
+        Parameters
+        ----------
+        output_dir : Path
+            Folder to write the files
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_dir.joinpath("metrics.json"), "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+        with open(output_dir.joinpath("metrics.prom"), "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+# Metrics of this process. Enabled by main.py --metrics.
+metrics = Metrics()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+
+def run_pipeline(extractor, creator, incremental=False, queue_size=2, projects=None, resume=False):
+    """
+    Fetch the issues and draw WordCloud figures at the same time.
+    Each project is drawn as soon as its issues are exported.
+
+    Parameters
+    ----------
+    extractor : IssueExtractor
+        Extractor to fetch the issues
+    creator : ImageCreator
+        Creator to draw the figures
+    incremental : bool
+        Keep the existing data and fetch only the updated issues.
+    queue_size : int
+        Maximum number of exported projects waiting to be drawn.
+        The extractor waits when the queue is full.
+    projects : list of String
+        Identifiers of the projects. All projects if not given.
+    resume : bool
+        Continue the interrupted fetch.
+
+    Returns
+    ----------
+    results : dict
+        Error message of each project, or None if succeeded
+    """
+    exported = queue.Queue(maxsize=max(1, queue_size))
+    errors = []
+
+    def fetch():
+        try:
+            for data_dir in extractor.iter_export_issues(incremental, projects, resume):
+                exported.put(data_dir)
+        except BaseException as ex:
+            errors.append(ex)
+        finally:
+            # End of the projects
+            exported.put(None)
+
+    fetcher = threading.Thread(target=fetch, name="fetcher", daemon=True)
+    fetcher.start()
+    results = creator.parse_and_draw_projects(iter(exported.get, None))
+    fetcher.join()
+    if errors:
+        raise errors[0]
+    return results
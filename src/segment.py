@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import zlib
+import struct
+from pathlib import Path
+
+# Record of the segment file: length of the compressed data
+RECORD = struct.Struct("<I")
+# Entry of the index file: issue id, offset and length of the record
+ENTRY = struct.Struct("<QQI")
+
+class IssueSegment:
+    """
+    Append-only segment file of the issues of a project.
+    Each issue is compressed separately, and the index file keeps its offset,
+    so an issue is read without scanning the segment.
+    An updated issue is appended again and the latest entry in the index is used.
+
+    Parameters
+    ----------
+    path : Path
+        Segment file. The index is written in the file with ".idx" added to the name.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.__data = open(self.path, "a+b")
+        self.__index = open(self.index_path, "a+b")
+        self.__offsets = self.read_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def __contains__(self, issue_id):
+        return issue_id in self.__offsets
+
+    def close(self):
+        self.__data.close()
+        self.__index.close()
+
+    def read_index(self):
+        """
+        Read the offsets of the issues from the index file.
+
+        Returns
+        ----------
+        offsets : dict
+            Offset and length of the record of each issue id
+        """
+        offsets = {}
+        self.entries = 0
+        size = os.path.getsize(self.path)
+        self.__index.seek(0)
+        data = self.__index.read()
+        # Ignore the entry broken by the crash
+        end = len(data) - len(data) % ENTRY.size
+        for issue_id, offset, length in ENTRY.iter_unpack(data[:end]):
+            if offset + length <= size:
+                offsets[issue_id] = (offset, length)
+                self.entries += 1
+        return offsets
+
+    def put(self, issue_id, value):
+        """
+        Append the issue.
+
+        Parameters
+        ----------
+        issue_id : int
+            Id of the issue
+        value : any
+            Issue data serializable in JSON
+        """
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        self.__data.seek(0, os.SEEK_END)
+        offset = self.__data.tell()
+        self.__data.write(RECORD.pack(len(data)))
+        self.__data.write(data)
+        length = RECORD.size + len(data)
+        self.__index.write(ENTRY.pack(issue_id, offset, length))
+        self.__offsets[issue_id] = (offset, length)
+        self.entries += 1
+
+    def get(self, issue_id):
+        """
+        Read the issue.
+
+        Parameters
+        ----------
+        issue_id : int
+            Id of the issue
+
+        Returns
+        ----------
+        value : any
+            Issue data, or None if not found
+        """
+        if issue_id not in self.__offsets:
+            return None
+        self.__data.flush()
+        offset, length = self.__offsets[issue_id]
+        self.__data.seek(offset)
+        record = self.__data.read(length)
+        (size,) = RECORD.unpack_from(record)
+        return json.loads(zlib.decompress(record[RECORD.size:RECORD.size + size]).decode("utf-8"))
+
+    def garbage(self):
+        """
+        Get the number of the old versions of the updated issues.
+        """
+        return self.entries - len(self.__offsets)
+
+    def ids(self):
+        """
+        Get the ids of the issues in the order of id.
+        """
+        return sorted(self.__offsets)
+
+    def iter_issues(self):
+        """
+        Iterate the issues in the order of id.
+
+        Yields
+        ----------
+        (issue_id, value) : tuple of int and any
+            Id and data of the issue
+        """
+        for issue_id in self.ids():
+            yield issue_id, self.get(issue_id)
+
+    def flush(self):
+        """
+        Write the appended issues to the disk. The segment is written before the index.
+        """
+        self.__data.flush()
+        os.fsync(self.__data.fileno())
+        self.__index.flush()
+        os.fsync(self.__index.fileno())
+
+    def clear(self):
+        """
+        Delete all issues.
+        """
+        self.__data.truncate(0)
+        self.__index.truncate(0)
+        self.__offsets = {}
+        self.entries = 0
+
+    def compact(self):
+        """
+        Rewrite the segment without the old versions of the updated issues.
+        """
+        tmp = IssueSegment(self.path.with_name(self.path.name + ".tmp"))
+        tmp.clear()
+        for issue_id, value in self.iter_issues():
+            tmp.put(issue_id, value)
+        tmp.flush()
+        tmp.close()
+        self.close()
+        os.replace(tmp.path, self.path)
+        os.replace(tmp.index_path, self.index_path)
+        self.__data = open(self.path, "a+b")
+        self.__index = open(self.index_path, "a+b")
+        self.__offsets = self.read_index()
+
+def export_issue_files(data_dir):
+    """
+    Export the issues in the segment to the files of each issue. (data/<PROJECT_ID>/issues/<ISSUE_ID>.json)
+
+    Parameters
+    ----------
+    data_dir : Path
+        Directory which have issue data
+
+    Returns
+    ----------
+    count : int
+        Number of exported issues
+    """
+    issue_dir = Path(data_dir).joinpath("issues")
+    issue_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with IssueSegment(Path(data_dir).joinpath("issues.seg")) as segment:
+        for issue_id, value in segment.iter_issues():
+            with open(issue_dir.joinpath(str(issue_id) + ".json"), "w", encoding="utf-8") as f:
+                f.write(json.dumps(value, indent=2, ensure_ascii=False))
+            count += 1
+    return count
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import re
+import json
+import hashlib
+from collections import Counter
+from pathlib import Path
+
+def parse_shard(text):
+    """
+    Parse the shard of the nodes.
+
+    Parameters
+    ----------
+    text : String
+        "i/N": the i-th shard (1 to N) of N shards
+
+    Returns
+    ----------
+    (index, count) : tuple of int
+        Index of the shard and the number of the shards
+    """
+    match = re.fullmatch(r"(\d+)/(\d+)", text or "")
+    if not match:
+        raise ValueError("Shard should be i/N: %s" % text)
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError("Shard index should be from 1 to %d: %s" % (count, text))
+    return index, count
+
+def shard_dir(index, count):
+    """
+    Get the folder of the outputs of the shard. (shards/<i>-of-<N>)
+    """
+    return Path("shards").joinpath("%d-of-%d" % (index, count))
+
+def stable_hash(identifier):
+    """
+    Hash the project identifier. The same on all nodes, unlike hash() of Python.
+    """
+    return int.from_bytes(hashlib.sha1(identifier.encode("utf-8")).digest()[:8], "big")
+
+def weight_of(issues):
+    """
+    Get the weight of the project from the number of the issues.
+    It is rounded up to a power of two, so the nodes counting the issues
+    at a little different time get the same weight in most cases.
+    """
+    return 1 << max(0, int(issues)).bit_length()
+
+def partition(issues, count):
+    """
+    Assign the projects to the shards. The largest project is assigned first to the lightest shard,
+    and the projects of the same weight are ordered by the hash of the identifier.
+
+    Parameters
+    ----------
+    issues : dict
+        Number of the issues of each project identifier
+    count : int
+        Number of the shards
+
+    Returns
+    ----------
+    assignment : dict
+        Shard (1 to N) of each project identifier
+    """
+    weights = {identifier: weight_of(n) for identifier, n in issues.items()}
+    loads = [0] * count
+    assignment = {}
+    for identifier in sorted(weights, key=lambda i: (-weights[i], stable_hash(i), i)):
+        shard = min(range(count), key=lambda s: (loads[s], s))
+        loads[shard] += weights[identifier]
+        assignment[identifier] = shard + 1
+    return assignment
+
+def select_projects(extractor, index, count, identifiers=None):
+    """
+    Count the issues of the projects and assign them to the shards.
+
+    Parameters
+    ----------
+    extractor : IssueExtractor
+        Extractor to count the issues
+    index : int
+        Index of the shard of this node
+    count : int
+        Number of the shards
+    identifiers : list of String
+        Identifiers of the projects. The projects in the config, or all projects if not given.
+
+    Returns
+    ----------
+    assignment : dict
+        Shard (1 to N) of each project identifier
+    """
+    projects = extractor.fetch_projects(identifiers, save=False)
+    issues = {project.identifier: extractor.count_issues(project) for project in projects}
+    assignment = partition(issues, count)
+    print("Shard %d/%d: %d of %d projects" % (
+        index, count, sum(1 for shard in assignment.values() if shard == index), len(assignment)))
+    return assignment
+
+def read_assignment(index, count):
+    """
+    Read the assignment of the projects recorded by the last fetch of the shard.
+
+    Returns
+    ----------
+    assignment : dict
+        Shard (1 to N) of each project identifier, or None if not fetched yet
+    """
+    summaryfile = shard_dir(index, count).joinpath("shard.json")
+    if not summaryfile.exists():
+        return None
+    with open(summaryfile, "r", encoding="utf-8") as f:
+        return json.load(f).get("assignment")
+
+def write_summary(index, count, assignment=None):
+    """
+    Sum the word counts of the projects in the shard, and write them to shard.json.
+    The projects moved to another shard are not counted, even if their data is left.
+
+    Parameters
+    ----------
+    index : int
+        Index of the shard
+    count : int
+        Number of the shards
+    assignment : dict
+        Shard of each project. The assignment in shard.json is kept if not given.
+
+    Returns
+    ----------
+    summary : dict
+        Assignment, totals of each project and word counts of the shard
+    """
+    root = shard_dir(index, count)
+    root.mkdir(parents=True, exist_ok=True)
+    summaryfile = root.joinpath("shard.json")
+    if assignment is None:
+        assignment = read_assignment(index, count)
+
+    words = Counter()
+    projects = {}
+    for wordsfile in sorted(root.joinpath("data").glob("*/words.json")):
+        if assignment and assignment.get(wordsfile.parent.name) != index:
+            continue
+        with open(wordsfile, "r", encoding="utf-8") as f:
+            wlist = Counter(dict(json.load(f)))
+        words.update(wlist)
+        projects[wordsfile.parent.name] = sum(wlist.values())
+    summary = {
+        "shard": index,
+        "count": count,
+        "assignment": assignment or {},
+        "projects": projects,
+        "total": sum(words.values()),
+        "words": words.most_common(),
+    }
+    with open(summaryfile, "w", encoding="utf-8") as f:
+        f.write(json.dumps(summary, indent=2, ensure_ascii=False))
+    return summary
+
+def merge_summaries(summaries):
+    """
+    Merge the word counts of all shards. The text is not parsed again.
+
+    Parameters
+    ----------
+    summaries : list of dict
+        Summaries written by write_summary() on each node
+
+    Returns
+    ----------
+    merged : dict
+        Shard and total of each project, and word counts (Counter) of all projects
+    """
+    if not summaries:
+        raise ValueError("No shards to merge.")
+    count = summaries[0]["count"]
+    indexes = sorted(summary["shard"] for summary in summaries)
+    if any(summary["count"] != count for summary in summaries) or indexes != list(range(1, count + 1)):
+        raise ValueError("Shards 1 to %d should be merged once each: %s" % (count, indexes))
+    # The nodes should have the same assignment, or some projects may be missed
+    assignment = summaries[0]["assignment"]
+    if any(summary["assignment"] != assignment for summary in summaries):
+        raise ValueError("Shards have different assignments of the projects. Fetch them again.")
+
+    words = Counter()
+    projects = {}
+    for summary in summaries:
+        for name, total in summary["projects"].items():
+            if name in projects:
+                raise ValueError("Project is in two shards: %s" % name)
+            projects[name] = {"shard": summary["shard"], "total": total}
+        words.update(dict(summary["words"]))
+    return {
+        "count": count,
+        "projects": projects,
+        "missing": sorted(set(assignment) - set(projects)),
+        "total": sum(words.values()),
+        "words": words,
+    }
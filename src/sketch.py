@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import heapq
+from collections import Counter
+
+class SpaceSaving:
+    """
+    Space-Saving sketch of the most frequent words with a fixed number of counters.
+    The memory does not depend on the number of words.
+
+    Each counted word has an estimated count and an error: the true count is between
+    count - error and count. Every word occurring more than total / capacity times is kept.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of the words to keep
+    """
+    def __init__(self, capacity):
+        assert capacity > 0, "Capacity should be positive."
+        self.capacity = int(capacity)
+        self.total = 0
+        self.__counts = {}
+        self.__errors = {}
+        # Heap of (count, word) to find the minimum. Old entries are skipped.
+        self.__heap = []
+
+    def __len__(self):
+        return len(self.__counts)
+
+    def __contains__(self, word):
+        return word in self.__counts
+
+    def add(self, word, count=1):
+        """
+        Count the word.
+
+        Parameters
+        ----------
+        word : String
+            Word to count
+        count : int
+            Number of occurrences
+        """
+        self.total += count
+        if word in self.__counts:
+            self.__counts[word] += count
+        elif len(self.__counts) < self.capacity:
+            self.__counts[word] = count
+            self.__errors[word] = 0
+        else:
+            # Replace the word with the minimum count. Its count is the error of the new word.
+            minimum, evicted = self.pop_minimum()
+            del self.__counts[evicted]
+            del self.__errors[evicted]
+            self.__counts[word] = minimum + count
+            self.__errors[word] = minimum
+        heapq.heappush(self.__heap, (self.__counts[word], word))
+        # Drop the old entries not to grow the heap
+        if len(self.__heap) > self.capacity * 4:
+            self.__heap = [(count, word) for word, count in self.__counts.items()]
+            heapq.heapify(self.__heap)
+
+    def pop_minimum(self):
+        while True:
+            count, word = heapq.heappop(self.__heap)
+            if self.__counts.get(word) == count:
+                return count, word
+
+    def update(self, counter):
+        """
+        Count the words of the counter.
+
+        Parameters
+        ----------
+        counter : dict
+            Number of occurrences of each word
+        """
+        for word, count in counter.items():
+            self.add(word, count)
+
+    def max_error(self):
+        """
+        Get the upper bound of the error of all counts. (total / capacity)
+        """
+        return self.total // self.capacity
+
+    def most_common(self, n=None):
+        """
+        Get the most frequent words.
+
+        Parameters
+        ----------
+        n : int
+            Number of the words. All kept words if not given.
+
+        Returns
+        ----------
+        words : list of tuple
+            Word, estimated count and error, largest count first
+        """
+        items = sorted(self.__counts.items(), key=lambda item: (-item[1], item[0]))
+        if n is not None:
+            items = items[:n]
+        return [(word, count, self.__errors[word]) for word, count in items]
+
+    def counts(self):
+        """
+        Get the estimated counts.
+
+        Returns
+        ----------
+        wlist : Counter
+            Estimated number of occurrences of each kept word
+        """
+        return Counter(self.__counts)
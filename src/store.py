@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+from pathlib import Path
+from src.utils import format_time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    description TEXT NOT NULL,
+    created_on TEXT,
+    updated_on TEXT
+);
+CREATE TABLE IF NOT EXISTS journals (
+    issue_id INTEGER NOT NULL,
+    journal_id INTEGER,
+    notes TEXT NOT NULL,
+    created_on TEXT
+);
+CREATE INDEX IF NOT EXISTS journals_issue ON journals (issue_id);
+CREATE TABLE IF NOT EXISTS changesets (
+    issue_id INTEGER NOT NULL,
+    revision TEXT,
+    comments TEXT NOT NULL,
+    committed_on TEXT
+);
+CREATE INDEX IF NOT EXISTS changesets_issue ON changesets (issue_id);
+"""
+
+def issue_to_record(issue):
+    """
+    Convert Redmine issue resource to the record of the store.
+
+    Parameters
+    ----------
+    issue : Redmine issue data
+        Redmine issue resource with journals and changesets
+
+    Returns
+    ----------
+    record : dict
+        Text and timestamp fields of the issue
+    """
+    journals = []
+    for journal in getattr(issue, "journals", None) or []:
+        if (hasattr(journal, "notes")) and (journal.notes is not None):
+            journals.append({
+                "id": getattr(journal, "id", None),
+                "notes": journal.notes,
+                "created_on": format_time(getattr(journal, "created_on", None)),
+            })
+    changesets = []
+    for changeset in getattr(issue, "changesets", None) or []:
+        changesets.append({
+            "revision": changeset.get("revision"),
+            "comments": changeset.get("comments") or "",
+            "committed_on": format_time(changeset.get("committed_on")),
+        })
+    return {
+        "id": issue.id,
+        "subject": getattr(issue, "subject", None) or "",
+        "description": getattr(issue, "description", None) or "",
+        "created_on": format_time(getattr(issue, "created_on", None)),
+        "updated_on": format_time(getattr(issue, "updated_on", None)),
+        "journals": journals,
+        "changesets": changesets,
+    }
+
+class IssueStore:
+    """
+    Compact issue store of one project on SQLite.
+
+    Parameters
+    ----------
+    path : Path
+        Database file of the store
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.__conn = sqlite3.connect(str(self.path))
+        self.__conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the database.
+        """
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+    def clear(self):
+        """
+        Delete all issues.
+        """
+        with self.__conn:
+            self.__conn.execute("DELETE FROM issues")
+            self.__conn.execute("DELETE FROM journals")
+            self.__conn.execute("DELETE FROM changesets")
+
+    def write_issues(self, records):
+        """
+        Insert or replace the issues in one transaction.
+
+        Parameters
+        ----------
+        records : iterable of dict
+            Records made by issue_to_record()
+        """
+        with self.__conn:
+            for record in records:
+                issue_id = record["id"]
+                self.__conn.execute("DELETE FROM journals WHERE issue_id = ?", (issue_id,))
+                self.__conn.execute("DELETE FROM changesets WHERE issue_id = ?", (issue_id,))
+                self.__conn.execute(
+                    "INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)",
+                    (issue_id, record["subject"], record["description"],
+                     record["created_on"], record["updated_on"]))
+                self.__conn.executemany(
+                    "INSERT INTO journals VALUES (?, ?, ?, ?)",
+                    [(issue_id, j["id"], j["notes"], j["created_on"]) for j in record["journals"]])
+                self.__conn.executemany(
+                    "INSERT INTO changesets VALUES (?, ?, ?, ?)",
+                    [(issue_id, c["revision"], c["comments"], c["committed_on"]) for c in record["changesets"]])
+
+    def count(self):
+        """
+        Count the issues.
+
+        Returns
+        ----------
+        count : int
+            Number of issues in the store
+        """
+        return self.__conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]
+
+    def iter_issues(self):
+        """
+        Iterate the issues in the order of id. Only one issue is kept in memory at a time.
+
+        Yields
+        ----------
+        record : dict
+            Record of the issue with journals and changesets
+        """
+        issues = self.__conn.execute(
+            "SELECT id, subject, description, created_on, updated_on FROM issues ORDER BY id")
+        journals = self.__conn.execute(
+            "SELECT issue_id, journal_id, notes, created_on FROM journals ORDER BY issue_id, rowid")
+        changesets = self.__conn.execute(
+            "SELECT issue_id, revision, comments, committed_on FROM changesets ORDER BY issue_id, rowid")
+        journal = journals.fetchone()
+        changeset = changesets.fetchone()
+        for issue_id, subject, description, created_on, updated_on in issues:
+            record = {
+                "id": issue_id,
+                "subject": subject,
+                "description": description,
+                "created_on": created_on,
+                "updated_on": updated_on,
+                "journals": [],
+                "changesets": [],
+            }
+            # Merge the rows of child tables sorted by issue id
+            while journal is not None and journal[0] <= issue_id:
+                if journal[0] == issue_id:
+                    record["journals"].append({"id": journal[1], "notes": journal[2], "created_on": journal[3]})
+                journal = journals.fetchone()
+            while changeset is not None and changeset[0] <= issue_id:
+                if changeset[0] == issue_id:
+                    record["changesets"].append({"revision": changeset[1], "comments": changeset[2], "committed_on": changeset[3]})
+                changeset = changesets.fetchone()
+            yield record
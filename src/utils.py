@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 import sys
+import json
+import time
+import threading
 from pathlib import Path
 
 def setup_folder(path):
@@ -40,5 +43,97 @@ def validate_param(x):
         print("Error in param. (str)")
         sys.exit()
 
+def read_config(path="config/projects.json"):
+    """
+    Read the config file.
+
+    Parameters
+    ----------
+    path : String
+        Config file in JSON format
+
+    Returns
+    ----------
+    config : dict
+        Config values. Empty if the file does not exist.
+    """
+    config_file = Path(path)
+    if not config_file.exists():
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def format_time(value):
+    """
+    Format the time of Redmine resource.
+
+    Parameters
+    ----------
+    value : datetime or String
+        Time value of Redmine resource
+
+    Returns
+    ----------
+    value : String
+        Time in ISO 8601 (UTC), or None if not available.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def peak_memory():
+    """
+    Get the peak resident set size of this process.
+
+    Returns
+    ----------
+    size : int
+        Peak memory in bytes, or 0 if unknown
+    """
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return 0
+    size = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return size if sys.platform == "darwin" else size * 1024
+
+class RateLimiter:
+    """
+    Token bucket to limit the request rate. Thread safe.
+
+    Parameters
+    ----------
+    rate : float
+        Number of tokens added per second. No limit if 0 or less.
+    burst : int
+        Maximum number of tokens kept in the bucket.
+    """
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.__tokens = float(self.burst)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token from the bucket. Block until a token is available.
+        """
+        if self.rate <= 0:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            # Reserve the token and wait for it outside of the bucket state
+            self.__tokens -= 1
+            wait = -self.__tokens / self.rate if self.__tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
 if __name__ == '__main__':
     setup_folder("tmp")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from src.metrics import metrics
+
+def refresh(extractor, creator, projects=None):
+    """
+    Fetch the issues updated since the last checkpoint, and draw the projects which have the updates.
+    Only the changed issues are tokenized, and the others are read from the token cache.
+
+    Parameters
+    ----------
+    extractor : IssueExtractor
+        Extractor to fetch the issues
+    creator : ImageCreator
+        Creator to draw the figures
+    projects : list of String
+        Identifiers of the projects. The projects in the config, or all projects if not given.
+
+    Returns
+    ----------
+    changes : dict
+        Number of the changed issues of each project, and the error message if failed
+    """
+    logger = logging.getLogger(__name__)
+    changes = {}
+    for project in extractor.fetch_projects(projects):
+        name = project.identifier
+        data_dir = extractor.data_dir.joinpath(name)
+        try:
+            with metrics.timer("fetch_seconds", name):
+                changed = extractor.fetch_issues_for_project(project, incremental=True)
+        except Exception as ex:
+            logger.warning("Failed to fetch %s: %s" % (name, repr(ex)))
+            changes[name] = {"changed": 0, "error": repr(ex)}
+            continue
+        changes[name] = {"changed": changed, "error": None}
+        if changed == 0:
+            continue
+        changes[name]["error"] = creator.try_parse_and_draw_for_project(data_dir)
+
+        # Time from the last update in Redmine to the refreshed image
+        updated_on = extractor.load_checkpoint(data_dir).get("updated_on")
+        if updated_on:
+            updated_on = datetime.strptime(updated_on, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+            lag = (datetime.now(timezone.utc) - updated_on).total_seconds()
+            metrics.observe("refresh_lag_seconds", max(0.0, lag), name)
+            logger.info("Refreshed %s, changed: %d, lag: %.1f sec" % (name, changed, lag))
+    return changes
+
+def watch(extractor, creator, interval=60, projects=None, stop=None, iterations=None, on_refresh=None):
+    """
+    Keep the extractor and the creator in this process, and refresh the images on the interval.
+    The tokenizer, the token cache and the connection to Redmine are reused.
+
+    Parameters
+    ----------
+    extractor : IssueExtractor
+        Extractor to fetch the issues
+    creator : ImageCreator
+        Creator to draw the figures
+    interval : float
+        Seconds from the start of a refresh to the next one
+    projects : list of String
+        Identifiers of the projects. The projects in the config, or all projects if not given.
+    stop : threading.Event
+        Event to stop watching. (e.g. set by SIGTERM)
+    iterations : int
+        Number of refreshes. Watch until stopped if not given.
+    on_refresh : function
+        Called with the changes after each refresh
+    """
+    logger = logging.getLogger(__name__)
+    stop = stop or threading.Event()
+    count = 0
+    while not stop.is_set():
+        start = time.monotonic()
+        try:
+            with metrics.timer("refresh_seconds"):
+                changes = refresh(extractor, creator, projects)
+        except Exception as ex:
+            # Keep watching if Redmine is down
+            logger.warning("Failed to refresh: %s" % repr(ex))
+            changes = None
+        metrics.count("refreshes_total")
+        if on_refresh is not None:
+            on_refresh(changes)
+        count += 1
+        if iterations is not None and count >= iterations:
+            break
+        stop.wait(max(0.0, interval - (time.monotonic() - start)))
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    month TEXT NOT NULL,
+    word TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (month, word)
+);
+CREATE TABLE IF NOT EXISTS totals (
+    month TEXT PRIMARY KEY,
+    total INTEGER NOT NULL
+);
+"""
+
+def month_of(value):
+    """
+    Get the month of the time.
+
+    Parameters
+    ----------
+    value : String
+        Time in ISO 8601 (e.g. 2024-01-02T00:00:00Z)
+
+    Returns
+    ----------
+    month : String
+        Month (YYYY-MM), or None if the time is unknown
+    """
+    if not value or not re.match(r"^\d{4}-\d{2}", value):
+        return None
+    return value[:7]
+
+def add_months(month, n):
+    """
+    Add the months to the month. (e.g. 2024-12 + 1 -> 2025-01)
+    """
+    year, mon = int(month[:4]), int(month[5:7])
+    index = year * 12 + (mon - 1) + n
+    return "%04d-%02d" % (index // 12, index % 12 + 1)
+
+def parse_window(text, latest):
+    """
+    Parse the window of the months.
+
+    Parameters
+    ----------
+    text : String
+        "YYYY-MM:YYYY-MM" (inclusive), "YYYY-MM", or "Nm" (last N months up to the latest month)
+    latest : String
+        Latest month in the index
+
+    Returns
+    ----------
+    (start, end) : tuple of String
+        First and last month of the window
+    """
+    match = re.fullmatch(r"(\d+)m", text)
+    if match:
+        assert latest is not None, "Index should have the counts to use the relative window."
+        return add_months(latest, 1 - int(match.group(1))), latest
+    match = re.fullmatch(r"(\d{4}-\d{2})(?::(\d{4}-\d{2}))?", text)
+    if not match:
+        raise ValueError("Window should be YYYY-MM:YYYY-MM, YYYY-MM or Nm: %s" % text)
+    start, end = match.group(1), match.group(2) or match.group(1)
+    if start > end:
+        raise ValueError("Window should start before the end: %s" % text)
+    return start, end
+
+def previous_window(start, end):
+    """
+    Get the window of the same length just before the window.
+    """
+    length = (int(end[:4]) * 12 + int(end[5:7])) - (int(start[:4]) * 12 + int(start[5:7])) + 1
+    return add_months(start, -length), add_months(start, -1)
+
+def trend(current, previous, top=20):
+    """
+    Compare the word counts of two windows by the share of each word.
+
+    Parameters
+    ----------
+    current : Counter
+        Word counts of the current window
+    previous : Counter
+        Word counts of the previous window
+    top : int
+        Number of words to report
+
+    Returns
+    ----------
+    (rising, falling) : tuple of list
+        Words with the counts of both windows and the change of the share, largest change first
+    """
+    current_total = sum(current.values()) or 1
+    previous_total = sum(previous.values()) or 1
+    changes = []
+    for word in set(current) | set(previous):
+        change = current[word] / current_total - previous[word] / previous_total
+        changes.append({"word": word, "current": current[word], "previous": previous[word], "change": change})
+    changes.sort(key=lambda c: (-c["change"], c["word"]))
+    rising = [c for c in changes[:top] if c["change"] > 0]
+    falling = [c for c in reversed(changes[-top:]) if c["change"] < 0]
+    return rising, falling
+
+class WordIndex:
+    """
+    Word counts of a project bucketed by month.
+    The counts of any window are the sum of the buckets, without parsing the text again.
+
+    Parameters
+    ----------
+    path : Path
+        Database file of the index
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.__conn = sqlite3.connect(str(self.path))
+        self.__conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.__conn.close()
+
+    def write(self, buckets):
+        """
+        Replace the counts of all months.
+
+        Parameters
+        ----------
+        buckets : dict
+            Word counts (Counter) of each month
+        """
+        with self.__conn:
+            self.__conn.execute("DELETE FROM counts")
+            self.__conn.execute("DELETE FROM totals")
+            for month, counter in buckets.items():
+                self.__conn.executemany("INSERT INTO counts (month, word, count) VALUES (?, ?, ?)",
+                                        [(month, word, count) for word, count in counter.items()])
+                self.__conn.execute("INSERT INTO totals (month, total) VALUES (?, ?)",
+                                    (month, sum(counter.values())))
+
+    def months(self):
+        """
+        Get the months which have the counts.
+
+        Returns
+        ----------
+        months : list of String
+            Months in order
+        """
+        return [row[0] for row in self.__conn.execute("SELECT month FROM totals ORDER BY month")]
+
+    def counts(self, start=None, end=None):
+        """
+        Sum the word counts of the months in the window.
+
+        Parameters
+        ----------
+        start : String
+            First month (YYYY-MM). From the first month if not given.
+        end : String
+            Last month (YYYY-MM). To the last month if not given.
+
+        Returns
+        ----------
+        wlist : Counter
+            Number of occurrences of each word
+        """
+        rows = self.__conn.execute(
+            "SELECT word, SUM(count) FROM counts WHERE month >= ? AND month <= ? GROUP BY word",
+            (start or "0000-00", end or "9999-99"))
+        return Counter(dict(rows))
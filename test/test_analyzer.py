@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+from src import analyzer
+from src.analyzer import get_backend, JanomeBackend, TokenizerBackend
+
+def fugashi_installed():
+    try:
+        import fugashi
+        return True
+    except ImportError:
+        return False
+
+# Test class
+class TestTokenizerBackend(unittest.TestCase):
+
+    def test_janome(self):
+        backend = get_backend("janome")
+        self.assertIsInstance(backend, JanomeBackend)
+        self.assertIn("サーバー", backend.words("サーバーのログを確認しました。"))
+        self.assertTrue(backend.signature().startswith("janome="))
+
+    def test_created_once(self):
+        # The dictionary is loaded once per process
+        backend = get_backend("janome")
+        with patch.object(analyzer, "create_analyzer") as create_analyzer:
+            self.assertIs(backend, get_backend("janome"))
+        create_analyzer.assert_not_called()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend("unknown")
+
+    def test_incomplete_backend(self):
+        class NoWords(TokenizerBackend):
+            name = "nowords"
+
+            def signature(self):
+                return "nowords"
+        # Fails when created, not while parsing
+        with self.assertRaises(TypeError):
+            NoWords()
+
+    def test_auto(self):
+        expected = "fugashi" if fugashi_installed() else "janome"
+        self.assertEqual(expected, get_backend("auto").name)
+
+    @unittest.skipUnless(fugashi_installed(), "fugashi is not installed")
+    def test_fugashi(self):
+        backend = get_backend("fugashi")
+        self.assertIn("サーバー", backend.words("サーバーのログを確認しました。"))
+        self.assertNotEqual(get_backend("janome").signature(), backend.signature())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.cache import TokenCache
+
+# Test class
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath("cache", "tokens.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_and_put(self):
+        with TokenCache(self.path, "v1") as cache:
+            key = cache.key("テキスト")
+            self.assertIsNone(cache.get(key))
+            cache.put(key, [["テキスト", 2], ["単語", 1]], 3)
+            self.assertEqual(([["テキスト", 2], ["単語", 1]], 3), cache.get(key))
+            self.assertEqual((1, 1), (cache.hits, cache.misses))
+        # The key depends on the signature
+        with TokenCache(self.path, "v2") as cache:
+            self.assertIsNone(cache.get(cache.key("テキスト")))
+
+    def test_evict(self):
+        with TokenCache(self.path, "v1", max_bytes=100) as cache:
+            keys = [cache.key(str(i)) for i in range(10)]
+            for key in keys:
+                cache.put(key, [["word", 1]], 1)
+            # Use the first key to keep it
+            cache.get(keys[0])
+        with TokenCache(self.path, "v1", max_bytes=100) as cache:
+            self.assertIsNotNone(cache.get(keys[0]))
+            self.assertIsNotNone(cache.get(keys[-1]))
+            self.assertIsNone(cache.get(keys[1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import re
+import time
+import unittest
+from src.cleaner import TextCleaner
+
+def legacy_cleanup(text):
+    # Cleanup of the previous version
+    text = re.sub(r'https?://[\w/:%#\$&\?\(\)~\.=\+\-]+', ' ', text)
+    text = re.sub(r'\w+([-+.]\w+)*@\w+([-.]\w+)*\.\w+([-.]\w+)*', ' ', text)
+    text = re.sub(r'[!-/:-@[-`{-~]', ' ', text)
+    text = re.sub(r'[■-♯①-⑨]', ' ', text)
+    return text
+
+LINES = [
+    "サーバーのログを確認しました。",
+    "詳細は https://example.com/redmine/issues/1?tab=history#note-2 を参照",
+    "連絡先: foo.bar+redmine@mail.example.co.jp まで",
+    "a@b は無効、user@host-name.example は有効",
+    "■手順① 再起動 ② 確認 (priority: high) [done] {x} ~y~",
+    "mail:a-b.c@d-e.f-g.h, http://x/y@z.w",
+    "",
+]
+
+# Test class
+class TestTextCleaner(unittest.TestCase):
+
+    def test_same_as_legacy(self):
+        cleaner = TextCleaner()
+        for line in LINES:
+            self.assertEqual(legacy_cleanup(line), cleaner.clean(line), line)
+        self.assertEqual([legacy_cleanup(line) for line in LINES], cleaner.clean_lines(LINES))
+
+    def test_pathological_input(self):
+        # The previous email pattern takes seconds on these lines
+        cleaner = TextCleaner()
+        lines = [
+            "a" * 20000,
+            "a." * 10000,
+            "a-" * 10000 + "@",
+            "a@" + "b." * 10000 + "!",
+            "a@" + "b-" * 10000,
+        ]
+        start = time.perf_counter()
+        for line in lines:
+            cleaner.clean(line)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_config(self):
+        cleaner = TextCleaner(patterns=[r"#\d+"], chars=["!", "a-c"])
+        self.assertEqual("issue   fixed  ", cleaner.clean("issue #12 fixed!a"))
+        self.assertNotEqual(TextCleaner().signature(), cleaner.signature())
+        self.assertEqual(TextCleaner().signature(), TextCleaner().signature())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,230 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+from collections import Counter
+from src import creator
+from src.creator import ImageCreator
+from src.store import IssueStore
+
+def make_record(issue_id, subject, description, notes=(), created_on="2024-01-01T00:00:00Z"):
+    return {
+        "id": issue_id,
+        "subject": subject,
+        "description": description,
+        "created_on": created_on,
+        "updated_on": created_on,
+        "journals": [{"id": n, "notes": note, "created_on": "2024-02-02T00:00:00Z"} for n, note in enumerate(notes)],
+        "changesets": [],
+    }
+
+# Test class
+class TestImageCreator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp.name).joinpath("pj")
+        self.data_dir.mkdir()
+        with IssueStore(self.data_dir.joinpath("issues.db")) as store:
+            store.write_issues([
+                make_record(1, "サーバーの障害", "サーバーが停止しました。\nhttps://example.com/ を確認してください。",
+                            notes=["サーバーを再起動しました。"]),
+                make_record(2, "ログの確認", "ログを確認してください。"),
+            ])
+
+    def creator(self, **kwargs):
+        # Keep the cache in the temporary folder
+        ic = ImageCreator(**kwargs)
+        ic.cache_path = str(Path(self.tmp.name).joinpath("tokens.db"))
+        return ic
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_extract_text(self):
+        ic = self.creator()
+        texts = list(ic.extract_text(self.data_dir))
+        self.assertEqual(2, len(texts))
+        self.assertEqual("サーバーの障害\nサーバーが停止しました。\nhttps://example.com/ を確認してください。\nサーバーを再起動しました。\n", texts[0])
+        self.assertFalse(self.data_dir.joinpath("text.txt").exists())
+
+    def test_parse_text_data(self):
+        ic = self.creator()
+        wlist = ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir))
+        self.assertEqual(3, wlist["サーバー"])
+        self.assertEqual(3, wlist["確認"])
+        self.assertNotIn("https", wlist)
+        # Stop words are removed while counting
+        self.assertNotIn("する", wlist)
+        self.assertEqual(wlist, ic.read_words(self.data_dir))
+        self.assertTrue(self.data_dir.joinpath("words.json").exists())
+        self.assertFalse(self.data_dir.joinpath("words.txt").exists())
+
+    def test_parallel_parse(self):
+        texts = list(self.creator().extract_text(self.data_dir)) * 5
+        serial = self.creator(workers=1)
+        serial.cache_path = ""
+        serial = serial.parse_text_data(self.data_dir, iter(texts))
+        ic = self.creator(workers=2)
+        ic.batch_size = 3
+        parallel = ic.parse_text_data(self.data_dir, iter(texts))
+        self.assertEqual(serial.most_common(), parallel.most_common())
+        # The pool is kept for the next parse, and stopped at the exit
+        self.assertTrue(creator._pools)
+        creator._shutdown_pools()
+        self.assertFalse(creator._pools)
+
+    def test_cached_parse(self):
+        ic = self.creator()
+        first = ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir))
+        # Edit one issue. The other issue is read from the cache.
+        with IssueStore(self.data_dir.joinpath("issues.db")) as store:
+            store.write_issues([make_record(2, "ログの確認", "ログを確認してください。ログ")])
+        with patch.object(ic, "count_texts", wraps=ic.count_texts) as count_texts:
+            second = ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir))
+        self.assertEqual(1, len(count_texts.call_args.args[1]))
+        self.assertEqual(first["ログ"] + 1, second["ログ"])
+        self.assertEqual(first["サーバー"], second["サーバー"])
+        self.assertEqual(list(first.keys()), list(second.keys()))
+
+    def test_month_index(self):
+        ic = self.creator()
+        texts = list(ic.extract_text(self.data_dir, by_month=True))
+        self.assertEqual([("2024-01", "サーバーの障害\nサーバーが停止しました。\nhttps://example.com/ を確認してください。\n"),
+                          ("2024-02", "サーバーを再起動しました。\n"),
+                          ("2024-01", "ログの確認\nログを確認してください。\n")], texts)
+        wlist = ic.parse_text_data(self.data_dir, iter(texts))
+        # Same counts as the texts of each issue
+        self.assertEqual(ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir)), wlist)
+
+        ic.window = "2024-02"
+        window, name = ic.read_window(self.data_dir)
+        self.assertEqual("pj_2024-02_2024-02", name)
+        self.assertEqual(1, window["サーバー"])
+        self.assertNotIn("ログ", window)
+        ic.window = "2m"
+        window, _ = ic.read_window(self.data_dir)
+        self.assertEqual(wlist, window)
+
+        report = ic.report_window([self.data_dir], top=3)
+        self.assertEqual(["2023-11", "2023-12"], report["previous"])
+        self.assertEqual(wlist.most_common(3), report["top"])
+        self.assertEqual(sum(wlist.values()), report["projects"]["pj"]["total"])
+
+    def test_topk_count(self):
+        exact = self.creator().parse_text_data(self.data_dir, self.creator().extract_text(self.data_dir))
+        ic = self.creator(config={"count.mode": "topk", "count.capacity": 4})
+        ic.cache_path = ""
+        wlist = ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir, by_month=True))
+        self.assertLessEqual(len(wlist), 4)
+        self.assertEqual(exact["サーバー"], wlist["サーバー"])
+        with open(self.data_dir.joinpath("words_bounds.json"), encoding="utf-8") as f:
+            bounds = json.load(f)
+        self.assertEqual(4, bounds["capacity"])
+        for word, count, error in bounds["words"]:
+            self.assertLessEqual(count - error, exact[word])
+            self.assertGreaterEqual(count, exact[word])
+
+    def test_render_cache(self):
+        import wordcloud
+        ic = self.creator(config={"draw.sizes": [300, 2400],
+                                  "font.path": str(Path(wordcloud.__file__).with_name("DroidSansMono.ttf"))})
+        ic.render_cache_path = str(Path(self.tmp.name).joinpath("render"))
+        wlist = Counter({"server": 5, "log": 3, "error": 1})
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with patch("wordcloud.WordCloud.generate_from_frequencies", autospec=True,
+                       side_effect=wordcloud.WordCloud.generate_from_frequencies) as layout:
+                def layouts():
+                    # WordCloud calls itself with max_font_size to find the font size of the layout
+                    return sum(1 for call in layout.call_args_list if "max_font_size" not in call.kwargs)
+
+                ic.draw_words_cloud(self.data_dir, wlist)
+                # All sizes are drawn from one layout
+                self.assertEqual(1, layouts())
+                from PIL import Image
+                for name, size in [("pj.png", (1200, 800)), ("pj_300.png", (300, 200)), ("pj_2400.png", (2400, 1600))]:
+                    with Image.open(Path("image").joinpath(name)) as image:
+                        self.assertEqual(size, image.size)
+                # Same words are not drawn again
+                ic.draw_words_cloud(self.data_dir, wlist)
+                self.assertEqual(1, layouts())
+                # Drawn again if the words or the files are changed
+                wlist["log"] += 1
+                ic.draw_words_cloud(self.data_dir, wlist)
+                self.assertEqual(2, layouts())
+                Path("image/pj_300.png").unlink()
+                ic.draw_words_cloud(self.data_dir, wlist)
+                self.assertEqual(3, layouts())
+        finally:
+            os.chdir(cwd)
+
+    def test_debug_files(self):
+        ic = self.creator(debug=True)
+        ic.parse_text_data(self.data_dir, ic.extract_text(self.data_dir))
+        self.assertTrue(self.data_dir.joinpath("text.txt").exists())
+        self.assertTrue(self.data_dir.joinpath("words.txt").exists())
+
+    def test_empty_data(self):
+        ic = self.creator()
+        self.assertIsNone(ic.parse_text_data(self.data_dir, iter([])))
+
+    def test_empty_data_after_parse(self):
+        ic = self.creator()
+        # The issues are emptied after the last parse
+        self.data_dir.joinpath("words.json").write_text(json.dumps([["stale", 9]]), encoding="utf-8")
+        self.data_dir.joinpath("words_bounds.json").write_text("{}", encoding="utf-8")
+        with IssueStore(self.data_dir.joinpath("issues.db")) as store:
+            store.write_issues([make_record(1, "", ""), make_record(2, "", "")])
+        with patch.object(ImageCreator, "draw_words_cloud") as draw:
+            ic.parse_and_draw_for_project(self.data_dir)
+        draw.assert_not_called()
+        self.assertIsNone(ic.read_words(self.data_dir))
+        self.assertFalse(self.data_dir.joinpath("words_bounds.json").exists())
+
+# Test class
+class TestParseAndDraw(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        # Good projects and a broken project
+        for name in ["small", "large"]:
+            data_dir = Path("data", name)
+            data_dir.mkdir(parents=True)
+            with IssueStore(data_dir.joinpath("issues.db")) as store:
+                count = 1 if name == "small" else 20
+                store.write_issues([make_record(i, "サーバーの障害", "ログを確認してください。") for i in range(1, count + 1)])
+        Path("data", "broken").mkdir()
+        Path("data", "broken", "issues.db").write_text("broken")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def check_results(self, workers, stages=("parse", "draw")):
+        ic = ImageCreator(workers=1, stages=stages)
+        ic.draw_workers = workers
+        with patch.object(ImageCreator, "draw_words_cloud") as draw:
+            results = ic.parse_and_draw()
+        self.assertEqual(["large", "small", "broken"], list(results.keys()))
+        self.assertIsNone(results["large"])
+        self.assertIsNone(results["small"])
+        self.assertIn("DatabaseError", results["broken"])
+        self.assertTrue(Path("data", "small", "words.json").exists())
+        return draw
+
+    def test_serial(self):
+        draw = self.check_results(1)
+        self.assertEqual(2, draw.call_count)
+
+    def test_parallel(self):
+        # The worker processes are not forked, so the patch of the draw is not seen in them
+        self.check_results(2, stages=("parse",))
+
+if __name__ == '__main__':
+    unittest.main()
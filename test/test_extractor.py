@@ -2,10 +2,25 @@ import os
 import sys
 from redminelib import Redmine
 from src.extractor import IssueExtractor
+from src.store import IssueStore
+import tempfile
 import unittest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import patch
 import pprint
 
+class FakeIssue:
+    # Issue with the attributes used by the extractor
+    def __init__(self, id, subject, updated_on):
+        self.id = id
+        self.subject = subject
+        self.updated_on = updated_on
+
+    def __iter__(self):
+        return iter([("id", self.id), ("subject", self.subject)])
+
 def mocked_redmine(*args, **kwargs):
 
     class MockRedmine:
@@ -117,10 +132,18 @@ def mocked_redmine(*args, **kwargs):
 # Test class
 class TestRedmineResponse(unittest.TestCase):
 
+    def setUp(self):
+        # Keep the cache of the responses in the temporary folder
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {"cache.http": str(Path(self.tmp.name).joinpath("http.db"))}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
     @patch('src.extractor.Redmine', side_effect=mocked_redmine)
     def test_redmine_projects(self, mock_get):
         print("::%s called" % sys._getframe().f_code.co_name)
-        ie = IssueExtractor()
+        ie = IssueExtractor(config=self.config)
 
         # Project list
         projects = ie.fetch_projects()
@@ -153,5 +176,40 @@ class TestRedmineResponse(unittest.TestCase):
         # mock_get.assert_called_with('http://localhost/redmine/', key=API_KEY)
         print(mock_get.mock_calls)
 
+    @patch('src.extractor.Redmine', side_effect=mocked_redmine)
+    def test_incremental_sync(self, mock_get):
+        print("::%s called" % sys._getframe().f_code.co_name)
+        with tempfile.TemporaryDirectory() as tmp:
+            ie = IssueExtractor(data_dir=tmp, config=self.config)
+            project = SimpleNamespace(id=1, identifier="pj")
+            project_dir = Path(tmp).joinpath("pj")
+
+            # First run fetches all issues
+            remote = {
+                1: FakeIssue(1, "first", datetime(2024, 1, 1)),
+                2: FakeIssue(2, "second", datetime(2024, 1, 2)),
+            }
+            with patch.object(ie, "iter_issue_list", return_value=iter([remote[1], remote[2]])) as fetch_list, \
+                 patch.object(ie, "fetch_issue_detail", side_effect=lambda i: remote[i]):
+                ie.fetch_issues_for_project(project, incremental=True)
+            fetch_list.assert_called_with(project, None, after_id=0)
+            self.assertEqual("2024-01-02T00:00:00Z", ie.load_checkpoint(project_dir)["updated_on"])
+
+            # Second run fetches the updated issues only
+            mtime = project_dir.joinpath("issues", "1.json").stat().st_mtime_ns
+            remote[2] = FakeIssue(2, "second (edited)", datetime(2024, 2, 1))
+            remote[3] = FakeIssue(3, "third", datetime(2024, 2, 2))
+            with patch.object(ie, "iter_issue_list", return_value=iter([remote[2], remote[3]])) as fetch_list, \
+                 patch.object(ie, "fetch_issue_detail", side_effect=lambda i: remote[i]):
+                ie.fetch_issues_for_project(project, incremental=True)
+            fetch_list.assert_called_with(project, "2024-01-02T00:00:00Z", after_id=0)
+
+            with IssueStore(project_dir.joinpath("issues.db")) as store:
+                issues = list(store.iter_issues())
+            self.assertEqual([1, 2, 3], [issue["id"] for issue in issues])
+            self.assertEqual("second (edited)", issues[1]["subject"])
+            self.assertEqual(mtime, project_dir.joinpath("issues", "1.json").stat().st_mtime_ns)
+            self.assertEqual("2024-02-02T00:00:00Z", ie.load_checkpoint(project_dir)["updated_on"])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
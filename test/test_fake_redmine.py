@@ -0,0 +1,228 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from bench.fake_redmine import FakeRedmine
+from src.extractor import IssueExtractor
+from src.store import IssueStore
+from src.segment import IssueSegment
+from src.metrics import metrics
+
+# Test class
+class TestFakeRedmine(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("REDMINE_API_KEY", "test")
+        self.fake = FakeRedmine(projects=2, issues=120, journals=2).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp.name).joinpath("data")
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+
+    def extractor(self, **config):
+        config.update({"redmine.url": self.fake.url, "fetch.rate": 0})
+        config.setdefault("cache.http", str(Path(self.tmp.name).joinpath("http.db")))
+        return IssueExtractor(data_dir=self.data_dir, config=config)
+
+    def test_export_issues(self):
+        ie = self.extractor()
+        ie.export_issues()
+        # 1 project page, and 2 issue pages and 120 issues for each project
+        self.assertEqual(1 + 2 * (2 + 120), self.fake.requests)
+        for name in ["project-1", "project-2"]:
+            with IssueStore(self.data_dir.joinpath(name, "issues.db")) as store:
+                issues = list(store.iter_issues())
+            self.assertEqual(120, len(issues))
+            self.assertEqual(2, len(issues[0]["journals"]))
+            self.assertEqual(1, len(issues[0]["changesets"]))
+
+    def test_metrics(self):
+        metrics.enabled = True
+        metrics.reset()
+        try:
+            self.extractor().export_issues()
+            summary = metrics.summary()
+        finally:
+            metrics.enabled = False
+            metrics.reset()
+        self.assertEqual(1, summary[""]["counters"]["http_requests_total"])
+        self.assertEqual(122, summary["project-1"]["counters"]["http_requests_total"])
+        self.assertEqual(120, summary["project-1"]["counters"]["issues_fetched_total"])
+        self.assertGreater(summary["project-1"]["counters"]["http_bytes_total"], 0)
+        self.assertEqual(122, summary["project-1"]["histograms"]["http_request_seconds"]["count"])
+        self.assertEqual(1, summary["project-2"]["histograms"]["fetch_seconds"]["count"])
+        self.assertGreater(summary[""]["counters"]["memory_peak_bytes"], 0)
+        self.assertNotIn("memory_peak_bytes", summary["project-1"]["counters"])
+
+    def test_http_cache(self):
+        self.extractor().export_issues()
+        requests, bytes_sent = self.fake.requests, self.fake.bytes_sent
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            first = list(store.iter_issues())
+        # Crawl again. The unchanged responses are not sent again.
+        self.extractor().export_issues()
+        self.assertEqual(requests * 2, self.fake.requests)
+        self.assertEqual(requests, self.fake.not_modified)
+        self.assertEqual(bytes_sent, self.fake.bytes_sent)
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            self.assertEqual(first, list(store.iter_issues()))
+        # Edited issue is sent again
+        self.fake.edit(first[0]["id"], "再起動しました。")
+        not_modified = self.fake.not_modified
+        self.extractor().export_issues()
+        self.assertLess(0, self.fake.not_modified - not_modified)
+        self.assertLess(self.fake.not_modified - not_modified, requests)
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            issues = {issue["id"]: issue for issue in store.iter_issues()}
+        self.assertEqual(3, len(issues[first[0]["id"]]["journals"]))
+
+    def test_close(self):
+        with self.extractor(**{"cache.http.max_bytes": 0}) as ie:
+            ie.export_issues()
+        # Requests after closing are not cached
+        ie.export_issues()
+        self.assertEqual(0, self.fake.not_modified)
+        # All responses are evicted when closed
+        self.extractor().export_issues()
+        self.assertEqual(0, self.fake.not_modified)
+
+    def test_logger(self):
+        import logging
+        from src import extractor
+        # Each line is logged once, however many extractors are made
+        for _ in range(3):
+            self.extractor()
+        self.assertEqual(1, len(logging.getLogger(extractor.__file__).handlers))
+
+    def test_gzip(self):
+        handle = self.fake.handle
+        encodings = []
+        def record(path, query, headers=None):
+            encodings.append(headers.get("Accept-Encoding"))
+            return handle(path, query, headers)
+        with patch.object(self.fake, "handle", side_effect=record):
+            self.extractor(**{"cache.http": ""}).export_issues()
+        self.assertEqual(self.fake.requests, len(encodings))
+        self.assertTrue(all("gzip" in encoding for encoding in encodings))
+
+    def test_bounded_buffer(self):
+        sizes = []
+        write_issues = IssueStore.write_issues
+
+        def write(store, records):
+            sizes.append(len(records))
+            write_issues(store, records)
+
+        with patch.object(IssueStore, "write_issues", write):
+            self.extractor(**{"fetch.flush": 16}).export_issues()
+        # 120 issues of each project are written by 16 issues
+        self.assertEqual(2 * 120, sum(sizes))
+        self.assertEqual(16, max(sizes))
+
+    def test_incremental(self):
+        ie = self.extractor()
+        ie.export_issues()
+        requests = self.fake.requests
+        # Only the last issue of each project is fetched again
+        ie.export_issues(incremental=True)
+        self.assertEqual(1 + 2 * (1 + 1), self.fake.requests - requests)
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            self.assertEqual(120, store.count())
+
+    def test_project_selection(self):
+        ie = self.extractor(identifier=["project-2", "missing"])
+        ie.export_issues()
+        # 2 projects, and 2 issue pages and 120 issues of project-2
+        self.assertEqual(2 + (2 + 120), self.fake.requests)
+        self.assertFalse(self.data_dir.joinpath("project-1").exists())
+        with IssueStore(self.data_dir.joinpath("project-2", "issues.db")) as store:
+            self.assertEqual(120, store.count())
+
+    def test_issue_filters(self):
+        config = {
+            "identifier": ["project-1"],
+            "issue.status": "open",
+            "issue.tracker": [1, 2],
+            "issue.created_on": ["2024-01-02", None],
+        }
+        self.extractor(**config).export_issues()
+        expected = [i for i in self.fake.issue_ids(1)
+                    if self.fake.issue(i)["status"]["id"] <= 3 and self.fake.issue(i)["tracker"]["id"] <= 2
+                    and self.fake.issue(i)["created_on"] >= "2024-01-02"]
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            ids = [issue["id"] for issue in store.iter_issues()]
+        self.assertEqual(expected, ids)
+        self.assertLess(len(ids), 60)
+        self.assertEqual(1 + 1 + len(expected), self.fake.requests)
+
+    def test_keywords(self):
+        config = {"identifier": ["project-1"], "issue.filter": [["project-1", "障害"], ["project-1", "ログ"]]}
+        self.extractor(**config).export_issues()
+        expected = [i for i in self.fake.issue_ids(1)
+                    if "障害" in self.fake.issue(i)["subject"] or "ログ" in self.fake.issue(i)["subject"]]
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            ids = [issue["id"] for issue in store.iter_issues()]
+        self.assertEqual(expected, ids)
+        self.assertLess(len(ids), 120)
+
+    def test_segment(self):
+        ie = self.extractor(**{"fetch.output": "segment"})
+        ie.export_issues()
+        project_dir = self.data_dir.joinpath("project-1")
+        self.assertFalse(project_dir.joinpath("issues").exists())
+        with IssueSegment(project_dir.joinpath("issues.seg")) as segment:
+            self.assertEqual(120, len(segment))
+            issue = dict(segment.get(5))
+        self.assertEqual(5, issue["id"])
+        self.assertEqual(2, len(issue["journals"]))
+
+        # The updated issues are appended
+        ie.export_issues(incremental=True)
+        with IssueSegment(project_dir.joinpath("issues.seg")) as segment:
+            self.assertEqual(120, len(segment))
+            self.assertEqual(1, segment.garbage())
+
+    def test_retry(self):
+        self.fake.error_rate = 0.2
+        ie = self.extractor(**{"fetch.retries": 10, "fetch.backoff": 0.001})
+        ie.export_issues()
+        self.assertGreater(self.fake.errors, 0)
+        for name in ["project-1", "project-2"]:
+            with IssueStore(self.data_dir.joinpath(name, "issues.db")) as store:
+                self.assertEqual(120, store.count())
+
+    def test_resume(self):
+        ie = self.extractor(**{"fetch.flush": 50})
+        fetch_issue_detail = ie.fetch_issue_detail
+
+        def interrupt(issue_id):
+            if issue_id == 81:
+                raise RuntimeError("interrupted")
+            return fetch_issue_detail(issue_id)
+
+        # Interrupted while project-1 is fetched
+        with patch.object(ie, "fetch_issue_detail", side_effect=interrupt):
+            with self.assertRaises(RuntimeError):
+                ie.export_issues()
+        with IssueStore(self.data_dir.joinpath("project-1", "issues.db")) as store:
+            self.assertGreaterEqual(store.count(), 50)
+
+        # Issues after the journal of project-1 and all issues of project-2 are fetched
+        requests = self.fake.requests
+        self.extractor().export_issues(resume=True)
+        self.assertEqual(1 + (1 + 70) + (2 + 120), self.fake.requests - requests)
+        for name in ["project-1", "project-2"]:
+            with IssueStore(self.data_dir.joinpath(name, "issues.db")) as store:
+                self.assertEqual(120, store.count())
+            self.assertFalse(self.data_dir.joinpath(name, "crawl.journal").exists())
+
+        # Completed projects are skipped
+        requests = self.fake.requests
+        self.extractor().export_issues(resume=True)
+        self.assertEqual(1, self.fake.requests - requests)
+
+if __name__ == '__main__':
+    unittest.main()
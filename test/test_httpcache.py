@@ -0,0 +1,37 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.httpcache import ResponseCache
+
+# Test class
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath("http.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_put(self):
+        cache = ResponseCache(self.path)
+        key = cache.key("GET", "http://localhost/issues.json?key=secret")
+        self.assertNotIn("secret", key)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, 'W/"1"', None, "application/json", b'{"issues": []}')
+        cache.close()
+        cache = ResponseCache(self.path)
+        self.assertEqual(('W/"1"', None, "application/json", b'{"issues": []}'), cache.get(key))
+        cache.close()
+
+    def test_evict(self):
+        cache = ResponseCache(self.path, max_bytes=600)
+        for i in range(10):
+            cache.put(str(i), str(i), None, None, bytes(range(256)) * (i + 1))
+        self.assertGreater(cache.evict(), 0)
+        self.assertIsNone(cache.get("0"))
+        self.assertIsNotNone(cache.get("9"))
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
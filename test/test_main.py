@@ -0,0 +1,56 @@
+import sys
+import time
+import subprocess
+import unittest
+from pathlib import Path
+
+# Top folder of the repository
+ROOT = Path(__file__).resolve().parent.parent
+
+# Libraries which take long time to import
+HEAVY_MODULES = ["janome", "wordcloud", "matplotlib", "numpy", "gensim", "redminelib"]
+
+def loaded_modules(code):
+    """
+    Run the code in a new interpreter and return the heavy modules loaded by it.
+    """
+    script = code + "\nimport sys\nprint(','.join(m for m in %r if m in sys.modules))" % HEAVY_MODULES
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+# Test class
+class TestStartup(unittest.TestCase):
+
+    def test_help_is_fast(self):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--help"], cwd=ROOT, capture_output=True, check=True)
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+    def test_no_heavy_imports(self):
+        code = "import main\nfor command in ['fetch', 'parse', 'draw', 'run']:\n    main.build_parser().parse_args([command])"
+        self.assertEqual([], loaded_modules(code))
+        self.assertEqual([], loaded_modules("import src.creator, src.pipeline, src.metrics"))
+
+    def test_fetch_imports(self):
+        # The crawl does not need the libraries to parse and draw
+        self.assertEqual(["redminelib"], loaded_modules("import src.extractor"))
+
+# Test class
+class TestCommand(unittest.TestCase):
+
+    def test_default_command(self):
+        import main
+        self.assertEqual(["run", "-p", "foo"], main.with_command(["-p", "foo"]))
+        self.assertEqual(["--metrics", "run"], main.with_command(["--metrics"]))
+        self.assertEqual(["draw", "-p", "foo"], main.with_command(["draw", "-p", "foo"]))
+        self.assertEqual(["--metrics", "parse"], main.with_command(["--metrics", "parse"]))
+        # The project may have the name of a command
+        self.assertEqual(["run", "-p", "draw"], main.with_command(["-p", "draw"]))
+        self.assertEqual(["run", "--project", "merge", "--shard", "1/2"],
+                         main.with_command(["--project", "merge", "--shard", "1/2"]))
+        args = main.build_parser().parse_args(main.with_command(["-p", "draw"]))
+        self.assertEqual("run", args.command)
+        self.assertEqual(["draw"], args.project)
+
+if __name__ == '__main__':
+    unittest.main()
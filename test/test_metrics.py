@@ -0,0 +1,68 @@
+import json
+import unittest
+from src.metrics import Metrics
+
+# Test class
+class TestMetrics(unittest.TestCase):
+
+    def test_disabled(self):
+        m = Metrics()
+        m.count("requests_total")
+        m.observe("request_seconds", 0.1)
+        with m.timer("fetch_seconds"):
+            pass
+        self.assertEqual({}, m.summary())
+
+    def test_summary(self):
+        m = Metrics(enabled=True)
+        m.count("requests_total", project="foo")
+        m.count("requests_total", 2, project="foo")
+        m.count("projects_total")
+        m.maximum("rss_bytes", 10)
+        m.maximum("rss_bytes", 5)
+        m.observe("request_seconds", 0.003, project="foo")
+        m.observe("request_seconds", 0.2, project="foo")
+        with m.timer("fetch_seconds", project="bar"):
+            pass
+        summary = json.loads(m.to_json())
+        self.assertEqual(3, summary["foo"]["counters"]["requests_total"])
+        self.assertEqual({"projects_total": 1, "rss_bytes": 10}, summary[""]["counters"])
+        histogram = summary["foo"]["histograms"]["request_seconds"]
+        self.assertEqual(2, histogram["count"])
+        self.assertEqual({"0.005": 1, "0.25": 1}, histogram["buckets"])
+        self.assertEqual(1, summary["bar"]["histograms"]["fetch_seconds"]["count"])
+
+    def test_prometheus(self):
+        m = Metrics(enabled=True)
+        m.count("requests_total", 3, project="foo")
+        m.observe("request_seconds", 0.2, project="foo")
+        text = m.to_prometheus()
+        self.assertIn("# TYPE redtickets_requests_total counter", text)
+        self.assertIn('redtickets_requests_total{project="foo"} 3', text)
+        self.assertIn('redtickets_request_seconds_bucket{project="foo",le="0.1"} 0', text)
+        self.assertIn('redtickets_request_seconds_bucket{project="foo",le="0.25"} 1', text)
+        self.assertIn('redtickets_request_seconds_bucket{project="foo",le="+Inf"} 1', text)
+        self.assertIn('redtickets_request_seconds_count{project="foo"} 1', text)
+
+    def test_prometheus_escape(self):
+        m = Metrics(enabled=True)
+        m.count("requests_total", 1, project='a\\b"c\nd')
+        self.assertIn('redtickets_requests_total{project="a\\\\b\\"c\\nd"} 1', m.to_prometheus())
+
+    def test_merge(self):
+        parent = Metrics(enabled=True)
+        child = Metrics(enabled=True)
+        parent.count("tokens_total", 1, project="foo")
+        child.count("tokens_total", 2, project="foo")
+        child.observe("draw_seconds", 1.0, project="foo")
+        parent.maximum("memory_peak_bytes", 10)
+        child.maximum("memory_peak_bytes", 5)
+        parent.merge(child.snapshot())
+        summary = parent.summary()
+        self.assertEqual(3, summary["foo"]["counters"]["tokens_total"])
+        self.assertEqual(10, summary[""]["counters"]["memory_peak_bytes"])
+        self.assertIn("# TYPE redtickets_memory_peak_bytes gauge", parent.to_prometheus())
+        self.assertEqual(1, summary["foo"]["histograms"]["draw_seconds"]["count"])
+
+if __name__ == '__main__':
+    unittest.main()
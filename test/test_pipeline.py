@@ -0,0 +1,76 @@
+import time
+import unittest
+from pathlib import Path
+from src.pipeline import run_pipeline
+
+class FakeExtractor:
+    def __init__(self, names, fail=False):
+        self.names = names
+        self.fail = fail
+        self.exported = []
+
+    def iter_export_issues(self, incremental, projects=None, resume=False):
+        for name in self.names:
+            if projects and name not in projects:
+                continue
+            self.exported.append(name)
+            yield Path("data", name)
+        if self.fail:
+            raise RuntimeError("fetch failed")
+
+class FakeCreator:
+    def __init__(self):
+        self.drawn = []
+
+    def parse_and_draw_projects(self, data_dirs):
+        results = {}
+        for data_dir in data_dirs:
+            time.sleep(0.05)
+            self.drawn.append(data_dir.name)
+            results[data_dir.name] = None
+        return results
+
+# Test class
+class TestPipeline(unittest.TestCase):
+
+    def test_pipeline(self):
+        ie = FakeExtractor(["a", "b", "c", "d", "e"])
+        ic = FakeCreator()
+        results = run_pipeline(ie, ic, queue_size=1)
+        self.assertEqual(["a", "b", "c", "d", "e"], ic.drawn)
+        self.assertEqual(["a", "b", "c", "d", "e"], list(results.keys()))
+
+    def test_project_filter(self):
+        ie = FakeExtractor(["a", "b", "c"])
+        ic = FakeCreator()
+        results = run_pipeline(ie, ic, projects=["a", "c"])
+        self.assertEqual(["a", "c"], ie.exported)
+        self.assertEqual(["a", "c"], list(results.keys()))
+
+    def test_bounded_queue(self):
+        ie = FakeExtractor(["a", "b", "c", "d", "e"])
+        ic = FakeCreator()
+        observed = []
+        original = ic.parse_and_draw_projects
+
+        def draw(data_dirs):
+            def observe():
+                for data_dir in data_dirs:
+                    time.sleep(0.05)
+                    # The extractor can be ahead by the queue size and the project in hand
+                    observed.append(len(ie.exported) - len(observed))
+                    yield data_dir
+            return original(observe())
+        ic.parse_and_draw_projects = draw
+        run_pipeline(ie, ic, queue_size=1)
+        self.assertLessEqual(max(observed), 3)
+
+    def test_fetch_error(self):
+        ie = FakeExtractor(["a"], fail=True)
+        ic = FakeCreator()
+        with self.assertRaises(RuntimeError):
+            run_pipeline(ie, ic)
+        self.assertEqual(["a"], ic.drawn)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from src.segment import IssueSegment, export_issue_files
+
+# Test class
+class TestIssueSegment(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name).joinpath("issues.seg")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_get(self):
+        with IssueSegment(self.path) as segment:
+            for i in range(1, 101):
+                segment.put(i, [["id", i], ["subject", "件名 %d" % i]])
+            self.assertEqual(100, len(segment))
+            self.assertEqual([["id", 42], ["subject", "件名 42"]], segment.get(42))
+            self.assertIsNone(segment.get(101))
+            segment.flush()
+        # The index is read again
+        with IssueSegment(self.path) as segment:
+            self.assertEqual(list(range(1, 101)), segment.ids())
+            self.assertEqual([["id", 100], ["subject", "件名 100"]], segment.get(100))
+
+    def test_update_and_compact(self):
+        with IssueSegment(self.path) as segment:
+            segment.put(1, {"subject": "old"})
+            segment.put(2, {"subject": "other"})
+            segment.put(1, {"subject": "new"})
+            self.assertEqual(1, segment.garbage())
+            self.assertEqual({"subject": "new"}, segment.get(1))
+            size = self.path.stat().st_size
+            segment.compact()
+            self.assertEqual(0, segment.garbage())
+            self.assertLess(self.path.stat().st_size, size)
+            self.assertEqual([(1, {"subject": "new"}), (2, {"subject": "other"})], list(segment.iter_issues()))
+            # Appended after the compaction
+            segment.put(3, {"subject": "third"})
+            self.assertEqual({"subject": "third"}, segment.get(3))
+
+    def test_broken_tail(self):
+        with IssueSegment(self.path) as segment:
+            segment.put(1, {"subject": "first"})
+            segment.flush()
+        # The index entry written without its record is ignored
+        with open(self.path.with_name("issues.seg.idx"), "ab") as f:
+            f.write(b"\x02" + b"\x00" * 7 + b"\xff" * 8 + b"\x00" * 3)
+        with IssueSegment(self.path) as segment:
+            self.assertEqual([1], segment.ids())
+
+    def test_export(self):
+        with IssueSegment(self.path) as segment:
+            segment.put(7, [["id", 7], ["subject", "件名"]])
+        self.assertEqual(1, export_issue_files(self.path.parent))
+        with open(self.path.parent.joinpath("issues", "7.json"), encoding="utf-8") as f:
+            self.assertEqual([["id", 7], ["subject", "件名"]], json.load(f))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+from collections import Counter
+from pathlib import Path
+from bench.fake_redmine import FakeRedmine
+from src.shard import parse_shard, partition, merge_summaries, shard_dir, write_summary
+
+# Top folder of the repository
+ROOT = Path(__file__).resolve().parent.parent
+
+def summary(index, count, assignment, words):
+    return {"shard": index, "count": count, "assignment": assignment,
+            "projects": {name: sum(w.values()) for name, w in words.items()},
+            "words": sum(words.values(), Counter()).most_common()}
+
+# Test class
+class TestShard(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual((1, 3), parse_shard("1/3"))
+        for text in ["0/3", "4/3", "1", "a/b"]:
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_partition(self):
+        issues = {"pj%d" % i: (i * 37) % 500 for i in range(100)}
+        assignment = partition(issues, 4)
+        self.assertEqual(set(issues), set(assignment))
+        self.assertEqual({1, 2, 3, 4}, set(assignment.values()))
+        # Same on every node, whatever the order of the projects
+        self.assertEqual(assignment, partition(dict(reversed(list(issues.items()))), 4))
+        # A little change of the issue count does not move the projects
+        self.assertEqual(assignment, partition(dict(issues, pj10=issues["pj10"] + 1), 4))
+        # Balanced by the issue count
+        loads = Counter()
+        for name, shard in assignment.items():
+            loads[shard] += issues[name]
+        self.assertLess(max(loads.values()), min(loads.values()) * 1.5)
+
+    def test_merge_summaries(self):
+        assignment = {"a": 1, "b": 2, "c": 2}
+        first = summary(1, 2, assignment, {"a": Counter({"サーバー": 2})})
+        second = summary(2, 2, assignment, {"b": Counter({"サーバー": 1, "ログ": 3})})
+        merged = merge_summaries([first, second])
+        self.assertEqual(Counter({"サーバー": 3, "ログ": 3}), merged["words"])
+        self.assertEqual({"shard": 2, "total": 4}, merged["projects"]["b"])
+        self.assertEqual(["c"], merged["missing"])
+        with self.assertRaises(ValueError):
+            merge_summaries([first])
+        with self.assertRaises(ValueError):
+            merge_summaries([first, dict(second, assignment={"a": 2, "b": 1, "c": 1})])
+        with self.assertRaises(ValueError):
+            merge_summaries([first, summary(2, 2, assignment, {"a": Counter({"ログ": 1})})])
+
+    def test_moved_project(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                def write_words(index, name, words):
+                    data_dir = shard_dir(index, 2).joinpath("data", name)
+                    data_dir.mkdir(parents=True, exist_ok=True)
+                    data_dir.joinpath("words.json").write_text(json.dumps(words.most_common()), encoding="utf-8")
+
+                write_words(1, "a", Counter({"ログ": 1}))
+                write_words(1, "b", Counter({"サーバー": 2}))
+                write_summary(1, 2, {"a": 1, "b": 1})
+                write_summary(2, 2, {"a": 1, "b": 1})
+                # b is moved to the shard 2. Its words are left in the shard 1.
+                write_words(2, "b", Counter({"サーバー": 3}))
+                summaries = [write_summary(i, 2, {"a": 1, "b": 2}) for i in (1, 2)]
+            finally:
+                os.chdir(cwd)
+        merged = merge_summaries(summaries)
+        self.assertEqual(Counter({"ログ": 1, "サーバー": 3}), merged["words"])
+        self.assertEqual({"shard": 2, "total": 3}, merged["projects"]["b"])
+
+class TestShardProcesses(unittest.TestCase):
+
+    def setUp(self):
+        self.fake = FakeRedmine(projects=5, issues=10, journals=1).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp.name)
+        self.work_dir.joinpath("config").mkdir()
+        with open(self.work_dir.joinpath("config", "projects.json"), "w", encoding="utf-8") as f:
+            json.dump({"redmine.url": self.fake.url, "fetch.rate": 0}, f)
+        self.env = dict(os.environ, REDMINE_API_KEY="test")
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+
+    def main(self, *args):
+        return subprocess.Popen([sys.executable, str(ROOT.joinpath("main.py"))] + list(args), cwd=self.work_dir,
+                                env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    def run_shards(self, command, count):
+        processes = [self.main(command, "--shard", "%d/%d" % (i, count)) for i in range(1, count + 1)]
+        for process in processes:
+            _, err = process.communicate(timeout=120)
+            self.assertEqual(0, process.returncode, err)
+
+    def merged_words(self, shards):
+        # Words of the projects assigned to each shard by the last fetch
+        expected = Counter()
+        for index, shard in enumerate(shards, 1):
+            with open(shard.parent.joinpath("shard.json"), encoding="utf-8") as f:
+                assignment = json.load(f)["assignment"]
+            for wordsfile in shard.glob("*/words.json"):
+                if assignment[wordsfile.parent.name] == index:
+                    expected.update(dict(json.loads(wordsfile.read_text(encoding="utf-8"))))
+        process = self.main("merge")
+        _, err = process.communicate(timeout=120)
+        self.assertEqual(0, process.returncode, err)
+        with open(self.work_dir.joinpath("shards", "words.json"), encoding="utf-8") as f:
+            self.assertEqual(expected, Counter(dict(json.load(f))))
+        with open(self.work_dir.joinpath("shards", "merged.json"), encoding="utf-8") as f:
+            return json.load(f)["projects"]
+
+    def test_shards(self):
+        self.run_shards("fetch", 2)
+        self.run_shards("parse", 2)
+        shards = [self.work_dir.joinpath("shards", "%d-of-2" % i, "data") for i in (1, 2)]
+        projects = [set(p.parent.name for p in shard.glob("*/issues.db")) for shard in shards]
+        # Each project is fetched by one node
+        self.assertEqual(set(), projects[0] & projects[1])
+        self.assertEqual(set("project-%d" % i for i in range(1, 6)), projects[0] | projects[1])
+        merged = self.merged_words(shards)
+        self.assertEqual(5, len(merged))
+
+        # A new project moves some projects to the other shard. Their old data is left.
+        self.fake.projects = 6
+        self.run_shards("fetch", 2)
+        self.run_shards("parse", 2)
+        moved = self.merged_words(shards)
+        self.assertEqual(6, len(moved))
+        self.assertTrue(any(moved[name]["shard"] != merged[name]["shard"] for name in merged))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import random
+import unittest
+from collections import Counter
+from src.sketch import SpaceSaving
+
+# Test class
+class TestSpaceSaving(unittest.TestCase):
+
+    def test_exact_in_capacity(self):
+        sketch = SpaceSaving(10)
+        sketch.update(Counter({"サーバー": 3, "ログ": 2}))
+        sketch.add("ログ")
+        self.assertEqual([("サーバー", 3, 0), ("ログ", 3, 0)], sketch.most_common())
+        self.assertEqual(6, sketch.total)
+
+    def test_error_bounds(self):
+        rnd = random.Random(0)
+        # Zipf-like words
+        words = ["w%d" % int(1 / rnd.random()) for _ in range(50000)]
+        exact = Counter(words)
+        sketch = SpaceSaving(50)
+        for word in words:
+            sketch.add(word)
+        self.assertEqual(50, len(sketch))
+        self.assertGreater(len(exact), 200)
+        for word, count, error in sketch.most_common():
+            self.assertLessEqual(count - error, exact[word])
+            self.assertGreaterEqual(count, exact[word])
+        # Every word more frequent than total / capacity is kept
+        for word, count in exact.items():
+            if count > sketch.max_error():
+                self.assertIn(word, sketch)
+        self.assertEqual([w for w, _ in exact.most_common(5)], [w for w, _, _ in sketch.most_common(5)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from src.store import IssueStore, issue_to_record
+
+def make_record(issue_id, subject, notes=(), comments=()):
+    return {
+        "id": issue_id,
+        "subject": subject,
+        "description": "description_%d" % issue_id,
+        "created_on": "2024-01-01T00:00:00Z",
+        "updated_on": "2024-01-02T00:00:00Z",
+        "journals": [{"id": n, "notes": note, "created_on": None} for n, note in enumerate(notes)],
+        "changesets": [{"revision": str(n), "comments": c, "committed_on": None} for n, c in enumerate(comments)],
+    }
+
+# Test class
+class TestIssueStore(unittest.TestCase):
+
+    def test_issue_to_record(self):
+        issue = SimpleNamespace(
+            id=1, subject="subject", description=None,
+            created_on=datetime(2024, 1, 1, 9, 30), updated_on=datetime(2024, 1, 2),
+            journals=[SimpleNamespace(id=10, notes="note", created_on=datetime(2024, 1, 3)),
+                      SimpleNamespace(id=11, notes=None), SimpleNamespace(id=12)],
+            changesets=[{"revision": "abc", "comments": "fix", "committed_on": "2024-01-04T00:00:00Z"}])
+        record = issue_to_record(issue)
+        self.assertEqual("", record["description"])
+        self.assertEqual("2024-01-01T09:30:00Z", record["created_on"])
+        self.assertEqual([{"id": 10, "notes": "note", "created_on": "2024-01-03T00:00:00Z"}], record["journals"])
+        self.assertEqual("fix", record["changesets"][0]["comments"])
+
+    def test_write_and_iterate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("issues.db")
+            with IssueStore(path) as store:
+                store.write_issues([
+                    make_record(3, "third", notes=["c1"]),
+                    make_record(1, "first", notes=["a1", "a2"], comments=["fix a"]),
+                    make_record(2, "second"),
+                ])
+                # Replace the issue with the new journals
+                store.write_issues([make_record(1, "first (edited)", notes=["a3"])])
+
+            with IssueStore(path) as store:
+                self.assertEqual(3, store.count())
+                issues = list(store.iter_issues())
+            self.assertEqual([1, 2, 3], [issue["id"] for issue in issues])
+            self.assertEqual("first (edited)", issues[0]["subject"])
+            self.assertEqual(["a3"], [j["notes"] for j in issues[0]["journals"]])
+            self.assertEqual([], issues[0]["changesets"])
+            self.assertEqual([], issues[1]["journals"])
+            self.assertEqual(["c1"], [j["notes"] for j in issues[2]["journals"]])
+
+if __name__ == '__main__':
+    unittest.main()
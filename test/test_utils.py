@@ -0,0 +1,34 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import RateLimiter, peak_memory
+
+# Test class
+class TestRateLimiter(unittest.TestCase):
+
+    def test_rate(self):
+        limiter = RateLimiter(50, burst=1)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: limiter.acquire(), range(11)))
+        # The first token is in the bucket, the next 10 tokens take 0.2 sec.
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_no_limit(self):
+        limiter = RateLimiter(0)
+        start = time.monotonic()
+        for _ in range(1000):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+# Test class
+class TestPeakMemory(unittest.TestCase):
+
+    def test_peak_memory(self):
+        before = peak_memory()
+        data = bytearray(64 * 1024 * 1024)
+        self.assertGreaterEqual(peak_memory(), before)
+        self.assertGreater(peak_memory(), len(data) // 2)
+
+if __name__ == '__main__':
+    unittest.main()
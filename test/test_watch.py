@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from bench.fake_redmine import FakeRedmine
+from src.extractor import IssueExtractor
+from src.creator import ImageCreator
+from src.watch import watch
+
+# Test class
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault("REDMINE_API_KEY", "test")
+        self.fake = FakeRedmine(projects=2, issues=20, journals=1).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmp.name).joinpath("data")
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+
+    def test_watch(self):
+        ie = IssueExtractor(data_dir=self.data_dir, config={"redmine.url": self.fake.url, "fetch.rate": 0,
+                                                                   "cache.http": str(Path(self.tmp.name).joinpath("http.db"))})
+        ic = ImageCreator(config={"cache.tokens": str(Path(self.tmp.name).joinpath("tokens.db"))})
+        refreshes = []
+
+        def on_refresh(changes):
+            refreshes.append(changes)
+            # Edit an issue after the first refresh
+            if len(refreshes) == 1:
+                self.fake.edit(3, "監視のアラートを修正しました。")
+
+        with patch.object(ImageCreator, "draw_words_cloud") as draw, \
+             patch.object(ic, "count_texts", wraps=ic.count_texts) as count_texts:
+            watch(ie, ic, interval=0, iterations=3, on_refresh=on_refresh)
+
+        # All projects are drawn first, then only the edited project
+        self.assertEqual({"project-1": 20, "project-2": 20}, {k: v["changed"] for k, v in refreshes[0].items()})
+        self.assertEqual({"project-1": 1, "project-2": 0}, {k: v["changed"] for k, v in refreshes[1].items()})
+        self.assertEqual({"project-1": 0, "project-2": 0}, {k: v["changed"] for k, v in refreshes[2].items()})
+        self.assertEqual(3, draw.call_count)
+        # Only the new note is tokenized again
+        self.assertEqual(1, sum(len(call.args[1]) for call in count_texts.call_args_list[-1:]))
+        self.assertGreaterEqual(ic.read_words(self.data_dir.joinpath("project-1"))["アラート"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
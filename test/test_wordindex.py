@@ -0,0 +1,52 @@
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from src.wordindex import WordIndex, month_of, add_months, parse_window, previous_window, trend
+
+# Test class
+class TestWordIndex(unittest.TestCase):
+
+    def test_months(self):
+        self.assertEqual("2024-01", month_of("2024-01-31T23:00:00Z"))
+        self.assertIsNone(month_of(None))
+        self.assertEqual("2025-01", add_months("2024-12", 1))
+        self.assertEqual("2023-11", add_months("2024-01", -2))
+
+    def test_parse_window(self):
+        self.assertEqual(("2024-01", "2024-03"), parse_window("2024-01:2024-03", "2024-12"))
+        self.assertEqual(("2024-05", "2024-05"), parse_window("2024-05", None))
+        self.assertEqual(("2024-10", "2024-12"), parse_window("3m", "2024-12"))
+        self.assertEqual(("2023-10", "2023-12"), previous_window("2024-01", "2024-03"))
+        with self.assertRaises(ValueError):
+            parse_window("last quarter", "2024-12")
+        with self.assertRaises(ValueError):
+            parse_window("2024-03:2024-01", "2024-12")
+
+    def test_counts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("words.db")
+            with WordIndex(path) as index:
+                index.write({
+                    "2024-01": Counter({"サーバー": 2, "ログ": 1}),
+                    "2024-02": Counter({"サーバー": 1}),
+                    "2024-04": Counter({"ログ": 5}),
+                })
+            with WordIndex(path) as index:
+                self.assertEqual(["2024-01", "2024-02", "2024-04"], index.months())
+                self.assertEqual(Counter({"サーバー": 3, "ログ": 6}), index.counts())
+                self.assertEqual(Counter({"サーバー": 3, "ログ": 1}), index.counts("2024-01", "2024-03"))
+                # The counts are replaced
+                index.write({"2024-05": Counter({"障害": 1})})
+                self.assertEqual(Counter({"障害": 1}), index.counts())
+
+    def test_trend(self):
+        previous = Counter({"サーバー": 8, "ログ": 2})
+        current = Counter({"サーバー": 2, "ログ": 6, "障害": 2})
+        rising, falling = trend(current, previous, top=5)
+        self.assertEqual(["ログ", "障害"], [c["word"] for c in rising])
+        self.assertEqual(["サーバー"], [c["word"] for c in falling])
+        self.assertEqual(8, falling[0]["previous"])
+
+if __name__ == '__main__':
+    unittest.main()